@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Jun 23 10:02:18 2025
+
+@author: Equipo 6
+
+Búsqueda del mínimo de cajas por sucursal que cumple la meta de espera:
+
+    cajas_minimas("COYOACAN", df, "2025-05-27", dias=30, percentil=0.95)
+
+La meta se cumple si el `percentil` de la espera en caja es de a lo más
+`espera_objetivo` minutos, es decir, si la fracción de pacientes que esperan
+más que eso no pasa de 1 - percentil, contando todos los días simulados.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from prioridad_dinamica import simular_atencion_heap
+from simulaciones import simulacion_pacientes_vectorizada
+
+ESPERA_OBJETIVO = 20  # minutos
+
+
+def _evaluar(dias_sim, cajas, espera_objetivo, permitidos):
+    """
+    Simula los días con `cajas` hasta terminar o hasta pasar de `permitidos`
+    pacientes fuera de meta, cuando ya no hay forma de cumplirla.
+    """
+    fuera_de_meta = 0
+    dias = 0
+    for df_dia in dias_sim:
+        esperas = simular_atencion_heap(df_dia, cajas)["espera_min"].to_numpy()
+        fuera_de_meta += int((esperas > espera_objetivo).sum())
+        dias += 1
+        if fuera_de_meta > permitidos:
+            break
+    return fuera_de_meta <= permitidos, fuera_de_meta, dias
+
+
+def cajas_minimas_dias(
+    dias_sim,
+    percentil=0.95,
+    espera_objetivo=ESPERA_OBJETIVO,
+    cajas_maximas=100,
+):
+    """
+    Mínimo de cajas que cumple la meta en todos los dias_sim juntos.
+
+    dias_sim es una lista de df_sim (uno por día) y se usa igual para cada
+    candidato, así que todos se comparan con las mismas llegadas. El primer
+    candidato es una estimación por carga de trabajo (minutos de atención
+    entre minutos con llegadas); no es una cota inferior, porque la atención
+    puede seguir después de la última llegada, así que la bisección baja
+    hasta 1 caja si la estimación ya cumple. Cada candidato deja de simularse
+    en cuanto rebasa los pacientes fuera de meta permitidos.
+
+    Regresa (cajas, evaluaciones), con una fila por candidato simulado; cajas
+    es None si ni cajas_maximas alcanza.
+    """
+    dias_sim = [df_dia.reset_index(drop=True) for df_dia in dias_sim if len(df_dia)]
+    total = sum(len(df_dia) for df_dia in dias_sim)
+    permitidos = math.floor((1 - percentil) * total + 1e-9)
+
+    carga = [
+        df_dia["TAPRecepcionMinutos"].sum()
+        / max(1.0, (df_dia["FechaHoraSimulada"].max() - df_dia["FechaHoraSimulada"].min()).total_seconds() / 60)
+        for df_dia in dias_sim
+    ]
+    cota = max(1, min(cajas_maximas, math.ceil(max(carga, default=1))))
+
+    filas = []
+    resultados = {}
+
+    def factible(cajas):
+        if cajas not in resultados:
+            cumple, fuera_de_meta, dias = _evaluar(dias_sim, cajas, espera_objetivo, permitidos)
+            resultados[cajas] = cumple
+            filas.append({
+                "cajas": cajas,
+                "factible": cumple,
+                "fuera_de_meta": fuera_de_meta,
+                "dias_simulados": dias,
+                "detenido_temprano": dias < len(dias_sim),
+            })
+        return resultados[cajas]
+
+    # Duplicar hasta encontrar un candidato factible, luego bisección; con 0
+    # cajas nadie se atiende, así que bajo = 0 nunca es factible
+    bajo, alto = 0, cota
+    while not factible(alto):
+        if alto >= cajas_maximas:
+            return None, pd.DataFrame(filas)
+        bajo, alto = alto, min(2 * alto, cajas_maximas)
+    while alto - bajo > 1:
+        medio = (bajo + alto) // 2
+        if factible(medio):
+            alto = medio
+        else:
+            bajo = medio
+    return alto, pd.DataFrame(filas)
+
+
+def cajas_minimas(
+    sucursal,
+    df,
+    fechabase,
+    dias=20,
+    percentil=0.95,
+    espera_objetivo=ESPERA_OBJETIVO,
+    semilla=0,
+    perfiles=None,
+    cajas_maximas=100,
+):
+    """
+    cajas_minimas_dias sobre `dias` días simulados de la sucursal.
+
+    Las llegadas se sortean una sola vez con `semilla` y se reutilizan para
+    todos los candidatos.
+    """
+    df_sim = simulacion_pacientes_vectorizada(
+        sucursal, df, fechabase, dias=dias,
+        rng=np.random.default_rng(semilla), perfiles=perfiles,
+    )
+    dias_sim = [df_dia for _, df_dia in df_sim.groupby("Dia")]
+    return cajas_minimas_dias(dias_sim, percentil, espera_objetivo, cajas_maximas)
+
+
+def cajas_minimas_red(sucursales, df, fechabase, **opciones):
+    """cajas_minimas de cada sucursal; regresa un dict sucursal -> cajas."""
+    return {
+        sucursal: cajas_minimas(sucursal, df, fechabase, **opciones)[0]
+        for sucursal in sucursales
+    }
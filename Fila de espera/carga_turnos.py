@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Jun 16 09:12:41 2025
+
+@author: Equipo 6
+
+Carga por bloques del reporte de turnos (ReporteTurnosPacientes.xlsx y
+muestras_clean.csv), con la misma limpieza que DataCleaning.ipynb:
+
+    fuentes = ["data/ReporteTurnosPacientes.xlsx", "data/muestras_clean.csv"]
+    datos = leer_turnos(fuentes)
+    procesar_turnos(fuentes, "data/turnos_parquet")
+    df = cargar_turnos("data/turnos_parquet", sucursales=["COYOACAN"])
+
+El resultado es la entrada de simulacion_pacientes: Sucursal categórica,
+FechaHoraLLegada datetime64 y minutos en float32.
+"""
+
+import itertools
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+TAMANO_BLOQUE = 500_000
+
+COLUMNAS_DESCARTADAS = [
+    "PacienteID",
+    "TAPRecepcionCaja",
+    "PacienteSP",
+    "PacienteGenero",
+    "PacienteFechaNacimiento",
+    "PacienteCodigoPostal",
+    "Orden",
+]
+
+CAJAS_POR_SUCURSAL = {
+    "COYOACAN": 10,
+    "CULIACAN": 7,
+    "CULIACAN CAÑADAS": 3,
+    "CULIACAN COLEGIO MILITAR": 4,
+    "CULIACAN LA CONQUISTA": 5,
+    "SAN MARTIN TEXMELUCAN": 4,
+}
+
+TIPOS = {
+    "TurnoMinutosEspera": "float32",
+    "TAPRecepcionMinutos": "float32",
+    "Cajas": "float32",
+    "Prioridad": "int8",
+}
+
+# Proporción de pacientes con prioridad (1) y sin ella (0) cuando el reporte no la trae
+PROBABILIDAD_PRIORIDAD = [0.6, 0.4]
+
+
+def leer_bloques(ruta, tamano_bloque=TAMANO_BLOQUE):
+    """Bloques de filas crudas de un .xlsx o .csv, sin cargar el archivo completo."""
+    ruta = Path(ruta)
+    if ruta.suffix.lower() in (".xlsx", ".xlsm"):
+        # read_excel no lee por bloques; openpyxl en modo read_only sí
+        from openpyxl import load_workbook
+
+        libro = load_workbook(ruta, read_only=True, data_only=True)
+        try:
+            filas = libro.active.iter_rows(values_only=True)
+            encabezado = next(filas)
+            while True:
+                bloque = list(itertools.islice(filas, tamano_bloque))
+                if not bloque:
+                    break
+                yield pd.DataFrame(bloque, columns=encabezado)
+        finally:
+            libro.close()
+    else:
+        yield from pd.read_csv(
+            ruta,
+            chunksize=tamano_bloque,
+            dtype={**TIPOS, "Sucursal": "category", "Prioridad": "float32",
+                   "FechaID": "string", "TurnoHoraInicio": "string"},
+        )
+
+
+def _fecha_hora_llegada(bloque):
+    """FechaHoraLLegada a partir de FechaID (aaaammdd) y TurnoHoraInicio, sin concatenar texto."""
+    if "FechaHoraLLegada" in bloque:
+        return pd.to_datetime(bloque["FechaHoraLLegada"], format="ISO8601")
+    fecha_id = pd.to_numeric(bloque["FechaID"]).astype(np.int64)
+    fecha = pd.to_datetime(pd.DataFrame({
+        "year": fecha_id // 10000,
+        "month": fecha_id // 100 % 100,
+        "day": fecha_id % 100,
+    }))
+    return fecha + pd.to_timedelta(bloque["TurnoHoraInicio"].astype(str))
+
+
+def _estadisticas(fuentes, tamano_bloque):
+    """Primera pasada: sucursales y medias para rellenar los minutos faltantes."""
+    suma_espera = []
+    suma_atencion = 0.0
+    n_atencion = 0
+    for ruta in fuentes:
+        for bloque in leer_bloques(ruta, tamano_bloque):
+            espera = pd.to_numeric(bloque["TurnoMinutosEspera"]).astype("float64")
+            suma_espera.append(
+                espera.groupby(bloque["Sucursal"].astype(str)).agg(["sum", "count"])
+            )
+            atencion = pd.to_numeric(bloque["TAPRecepcionMinutos"]).astype("float64")
+            suma_atencion += atencion.sum()
+            n_atencion += atencion.count()
+
+    por_sucursal = pd.concat(suma_espera).groupby(level=0).sum()
+    media_espera = por_sucursal["sum"] / por_sucursal["count"]
+    media_atencion = suma_atencion / n_atencion if n_atencion else np.nan
+    return sorted(por_sucursal.index), media_espera, media_atencion
+
+
+def limpiar_bloque(bloque, sucursales, media_espera, media_atencion, rng):
+    """
+    Limpieza de DataCleaning.ipynb sobre un bloque, con tipos explícitos.
+
+    TurnoMinutosEspera se rellena con la media de su sucursal y
+    TAPRecepcionMinutos con la media global, ambas calculadas sobre todas
+    las fuentes. Sin columna Prioridad se sortea 1/0 con probabilidad 0.6/0.4.
+    """
+    bloque = bloque.drop(columns=[c for c in COLUMNAS_DESCARTADAS if c in bloque])
+    limpio = pd.DataFrame({
+        "Sucursal": pd.Categorical(bloque["Sucursal"].astype(str), categories=sucursales),
+        "FechaHoraLLegada": _fecha_hora_llegada(bloque).astype("datetime64[ns]"),
+    })
+
+    espera = pd.to_numeric(bloque["TurnoMinutosEspera"]).astype("float32")
+    limpio["TurnoMinutosEspera"] = espera.fillna(
+        limpio["Sucursal"].map(media_espera).astype("float32")
+    ).astype("float32")
+    limpio["TAPRecepcionMinutos"] = (
+        pd.to_numeric(bloque["TAPRecepcionMinutos"]).fillna(media_atencion).astype("float32")
+    )
+    limpio["Cajas"] = limpio["Sucursal"].map(CAJAS_POR_SUCURSAL).astype("float32")
+    if "Prioridad" in bloque and bloque["Prioridad"].notna().all():
+        limpio["Prioridad"] = bloque["Prioridad"].astype("int8")
+    else:
+        limpio["Prioridad"] = rng.choice(
+            np.array([1, 0], dtype=np.int8), size=len(limpio), p=PROBABILIDAD_PRIORIDAD
+        )
+    return limpio
+
+
+def turnos_limpios(fuentes, tamano_bloque=TAMANO_BLOQUE, rng=None):
+    """Bloques ya limpios de todas las fuentes, con las mismas categorías de Sucursal."""
+    if isinstance(fuentes, (str, Path)):
+        fuentes = [fuentes]
+    if rng is None:
+        rng = np.random.default_rng(np.random.randint(2**32, dtype=np.uint64))
+
+    sucursales, media_espera, media_atencion = _estadisticas(fuentes, tamano_bloque)
+    for ruta in fuentes:
+        for bloque in leer_bloques(ruta, tamano_bloque):
+            yield limpiar_bloque(bloque, sucursales, media_espera, media_atencion, rng)
+
+
+def leer_turnos(fuentes, tamano_bloque=TAMANO_BLOQUE, rng=None):
+    """Todas las fuentes limpias en un solo DataFrame (el df_combinado del notebook)."""
+    return pd.concat(list(turnos_limpios(fuentes, tamano_bloque, rng)), ignore_index=True)
+
+
+def procesar_turnos(fuentes, destino, tamano_bloque=TAMANO_BLOQUE, rng=None):
+    """
+    Escribe las fuentes limpias como Parquet particionado por sucursal.
+
+    Cada bloque agrega un archivo destino/Sucursal=<nombre>/parte-<k>.parquet,
+    así que nunca se tiene más de un bloque en memoria. Regresa el número de
+    filas escritas por sucursal. Requiere pyarrow.
+    """
+    destino = Path(destino)
+    filas = {}
+    for k, bloque in enumerate(turnos_limpios(fuentes, tamano_bloque, rng)):
+        for sucursal, grupo in bloque.groupby("Sucursal", observed=True):
+            carpeta = destino / f"Sucursal={sucursal}"
+            carpeta.mkdir(parents=True, exist_ok=True)
+            grupo.drop(columns="Sucursal").to_parquet(
+                carpeta / f"parte-{k:05d}.parquet", index=False
+            )
+            filas[sucursal] = filas.get(sucursal, 0) + len(grupo)
+    return filas
+
+
+def cargar_turnos(destino, sucursales=None):
+    """
+    Lee el Parquet de procesar_turnos, opcionalmente solo algunas sucursales,
+    con las columnas en el orden de leer_turnos.
+    """
+    filtros = [("Sucursal", "in", list(sucursales))] if sucursales is not None else None
+    df = pd.read_parquet(destino, filters=filtros)
+    # La partición llega como última columna
+    sucursal = df.pop("Sucursal").astype(str).astype("category")
+    df.insert(0, "Sucursal", sucursal)
+    return df
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Jun 25 12:31:09 2025
+
+@author: Equipo 6
+
+Despachador en vivo para las cajas de recepción, con la misma regla de
+prioridad dinámica que simular_atencion:
+
+    despachador = DespachadorCajas(cajas=4)
+    despachador.encolar(paciente)                # llega a la sucursal
+    despachador.caja_libre(2, datetime.now())    # -> siguiente paciente para la caja 2
+    despachador.retirar(paciente.id)             # se fue sin ser atendido
+    despachador.estado()
+
+reproducir_dia vuelve a correr un día registrado con el despachador para
+compararlo contra simular_atencion antes de usarlo en las pantallas.
+"""
+
+from datetime import timedelta
+
+from prioridad_dinamica import ColaPrioridadDinamica, SimulacionAtencion
+
+
+class DespachadorCajas:
+    """
+    Cola de recepción y estado de las cajas, operación por operación.
+
+    encolar, caja_libre y retirar cuestan O(log n) sobre la cola de
+    ColaPrioridadDinamica. Las cajas se numeran de 1 a `cajas`, como en los
+    resultados de simular_atencion.
+    """
+
+    def __init__(self, cajas, espera_maxima=timedelta(minutes=20)):
+        self.cola = ColaPrioridadDinamica(espera_maxima)
+        self.cajas = {caja: None for caja in range(1, cajas + 1)}  # caja -> (paciente, hora_inicio)
+        self._orden = {}  # id de paciente -> número de orden en la cola
+        self.atendidos = 0
+        self.retirados = 0
+
+    def __len__(self):
+        return len(self.cola)
+
+    def encolar(self, paciente, desempate=None):
+        """
+        Da de alta a un paciente que acaba de llegar. `desempate` ordena a
+        quienes tienen el mismo puntaje (por omisión, el orden de alta).
+        """
+        if paciente.id in self._orden:
+            raise ValueError(f"El paciente {paciente.id} ya está en la cola")
+        self._orden[paciente.id] = self.cola.agregar(paciente, desempate)
+
+    def caja_libre(self, caja, ahora):
+        """
+        La caja terminó (o abrió) a la hora `ahora`: regresa al siguiente
+        paciente que debe atender, o None si no hay nadie esperando.
+        """
+        if caja not in self.cajas:
+            raise KeyError(f"No existe la caja {caja}")
+        paciente = self.cola.siguiente(ahora)
+        if paciente is None:
+            self.cajas[caja] = None
+            return None
+        del self._orden[paciente.id]
+        self.cajas[caja] = (paciente, ahora)
+        self.atendidos += 1
+        return paciente
+
+    def retirar(self, id_paciente):
+        """El paciente se fue sin ser atendido; regresa False si ya no estaba en la cola."""
+        orden = self._orden.pop(id_paciente, None)
+        if orden is None or not self.cola.retirar(orden):
+            return False
+        self.retirados += 1
+        return True
+
+    def estado(self):
+        return {
+            "en_cola": len(self.cola),
+            "atendidos": self.atendidos,
+            "retirados": self.retirados,
+            "cajas": {
+                caja: None if ocupada is None else {
+                    "paciente": ocupada[0].id,
+                    "prioridad": ocupada[0].prioridad_inicial,
+                    "hora_inicio": ocupada[1],
+                }
+                for caja, ocupada in self.cajas.items()
+            },
+        }
+
+
+def reproducir_dia(df_sim, cajas, columna_abandono=None, despachador=None, registro=None):
+    """
+    Corre un día de turnos (mismas columnas que df_sim) a través de un
+    DespachadorCajas, con el mismo recorrido que SimulacionAtencion.
+
+    Sin abandonos regresa el mismo DataFrame que simular_atencion con
+    verbose=False. Con `columna_abandono`, los pacientes que siguen en la cola
+    a esa hora (NaT = nunca) se retiran sin ser atendidos y no aparecen en el
+    resultado. `registro` funciona igual que en simular_atencion.
+    """
+    import pandas as pd
+
+    despachador = despachador if despachador is not None else DespachadorCajas(cajas)
+    salidas = []
+    if columna_abandono is not None:
+        salidas = sorted(
+            ((hora, i) for i, hora in df_sim[columna_abandono].items() if pd.notna(hora)),
+            key=lambda salida: salida[0],
+        )
+    return SimulacionAtencion(
+        df_sim, len(despachador.cajas), registro, despachador=despachador, salidas=salidas
+    ).avanzar()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Jun 17 11:05:37 2025
+
+@author: Equipo 6
+
+Perfiles de llegada y atención por sucursal, calculados una sola vez y
+guardados en disco:
+
+    perfiles = AlmacenPerfiles(df, "data/perfiles.npz")
+    df_sim = simulacion_pacientes_vectorizada("COYOACAN", None, "2025-05-27",
+                                              dias=100, perfiles=perfiles)
+
+El archivo lleva el hash de los datos de origen; si los datos cambian, los
+perfiles se recalculan y se sobrescribe.
+"""
+
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from simulaciones import HORAS_SIMULADAS, _perfil
+
+COLUMNAS_PERFIL = ["Sucursal", "FechaHoraLLegada", "Prioridad", "TAPRecepcionMinutos"]
+
+# Cambiar si cambia la forma de calcular los perfiles, para invalidar los archivos viejos
+VERSION_PERFIL = 1
+
+
+def hash_datos(df):
+    """Hash de las columnas de df que usan los perfiles (y de las horas simuladas)."""
+    h = hashlib.sha256(f"v{VERSION_PERFIL}:{HORAS_SIMULADAS.tolist()}".encode())
+    filas = pd.util.hash_pandas_object(df[COLUMNAS_PERFIL], index=False)
+    h.update(filas.to_numpy().tobytes())
+    return h.hexdigest()
+
+
+class AlmacenPerfiles:
+    """
+    Tasa de llegadas por hora, distribución de prioridad y muestra de tiempos
+    de atención de cada sucursal de df.
+
+    Todas las sucursales salen de un solo groupby. Con `ruta`, los perfiles
+    se leen de ese .npz si su hash coincide con el de df; si no, se calculan
+    y se guardan ahí.
+    """
+
+    def __init__(self, df, ruta=None):
+        self.hash = hash_datos(df)
+        self.ruta = Path(ruta) if ruta is not None else None
+        self._perfiles = None
+        if self.ruta is not None and self.ruta.exists():
+            self._perfiles = self._leer()
+        if self._perfiles is None:
+            self._perfiles = {
+                str(sucursal): _perfil(df_sucursal)
+                for sucursal, df_sucursal in df.groupby("Sucursal", observed=True, sort=False)
+            }
+            if self.ruta is not None:
+                self._guardar()
+
+    @property
+    def sucursales(self):
+        return list(self._perfiles)
+
+    def perfil(self, sucursal):
+        """(tasas por hora, prioridades, tiempos), igual que _perfil_sucursal."""
+        try:
+            return self._perfiles[sucursal]
+        except KeyError:
+            raise KeyError(f"No hay datos de la sucursal {sucursal!r}") from None
+
+    def _guardar(self):
+        arreglos = {
+            "hash": np.array(self.hash),
+            "sucursales": np.array(self.sucursales),
+        }
+        for i, (tasas, prioridades, tiempos) in enumerate(self._perfiles.values()):
+            arreglos[f"tasas_{i}"] = tasas
+            arreglos[f"prioridad_valores_{i}"] = prioridades.index.to_numpy()
+            arreglos[f"prioridad_probabilidades_{i}"] = prioridades.to_numpy()
+            arreglos[f"tiempos_{i}"] = tiempos
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        # np.savez agrega .npz si falta; se escribe por un archivo abierto para respetar la ruta
+        with open(self.ruta, "wb") as archivo:
+            np.savez(archivo, **arreglos)
+
+    def _leer(self):
+        with np.load(self.ruta, allow_pickle=False) as datos:
+            if str(datos["hash"]) != self.hash:
+                return None
+            perfiles = {}
+            for i, sucursal in enumerate(datos["sucursales"].tolist()):
+                prioridades = pd.Series(
+                    datos[f"prioridad_probabilidades_{i}"],
+                    index=pd.Index(datos[f"prioridad_valores_{i}"], name="Prioridad"),
+                    name="proportion",
+                )
+                perfiles[sucursal] = (
+                    datos[f"tasas_{i}"], prioridades, datos[f"tiempos_{i}"]
+                )
+        return perfiles
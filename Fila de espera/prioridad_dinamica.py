@@ -4,9 +4,16 @@ Created on Tue May 27 10:43:07 2025
 
 @author: Equipo 6
 """
-import numpy as np
-import pandas as pd
-from datetime import timedelta
+import heapq
+import logging
+from datetime import datetime, timedelta
+
+# numpy y pandas se importan hasta que se arman resultados, para que la cola
+# y el despachador en vivo carguen sin ellos
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
 
 class Paciente:
     def __init__(self, id, sucursal, hora_llegada, prioridad, tiempo_estimado):
@@ -31,10 +38,211 @@ def seleccionar_siguiente_paciente(cola, hora_actual):
     return None
 
 
+class ColaPrioridadDinamica:
+    """
+    Cola que elige al mismo paciente que seleccionar_siguiente_paciente en O(log n).
+
+    El puntaje prioridad*15 + espera*3 crece al mismo ritmo para todos los
+    pacientes, así que el orden entre los que ya llegaron no cambia con el
+    tiempo: basta un heap con la llave prioridad*15 - 3*llegada, calculada en
+    enteros para que dos puntajes iguales empaten de verdad. Un segundo heap
+    guarda a los que ya esperaron 20 minutos o más, que siempre van primero.
+    Entre puntajes iguales decide el mismo cálculo en flotantes de
+    calcular_puntaje y, si también empatan, el menor `desempate` (por omisión,
+    el orden de alta): max() sobre la cola de simular_atencion se queda con el
+    primero en el orden del DataFrame, así que SimulacionAtencion pasa la
+    posición de la fila.
+    """
+
+    RECIENTE, LARGO = 0, 1
+
+    def __init__(self, espera_maxima=timedelta(minutes=20)):
+        self.espera_maxima = espera_maxima
+        self._recientes = []  # (-llave, desempate, orden, paciente)
+        self._largos = []  # (-llave, desempate, orden, paciente)
+        self._por_llegada = []  # (hora_llegada, orden, desempate, paciente)
+        self._estado = {}  # orden -> RECIENTE / LARGO, sólo de quien sigue en la cola
+        self._orden = 0
+        self._en_cola = 0
+
+    def __len__(self):
+        return self._en_cola
+
+    @staticmethod
+    def _llave(paciente):
+        # prioridad*15 - 3*llegada en microsegundos (las prioridades son enteras);
+        # funciona igual con datetime y con pd.Timestamp
+        llegada = (paciente.hora_llegada - EPOCH) // timedelta(microseconds=1)
+        return 3 * llegada - int(paciente.prioridad_inicial) * 900_000_000
+
+    def agregar(self, paciente, desempate=None):
+        """
+        Da de alta a un paciente que ya llegó; regresa su número de orden. Entre
+        puntajes iguales sale primero el de menor `desempate` (por omisión, el
+        orden de alta).
+        """
+        orden = self._orden
+        self._orden += 1
+        desempate = orden if desempate is None else desempate
+        self._estado[orden] = self.RECIENTE
+        self._en_cola += 1
+        heapq.heappush(self._recientes, (self._llave(paciente), desempate, orden, paciente))
+        heapq.heappush(self._por_llegada, (paciente.hora_llegada, orden, desempate, paciente))
+        return orden
+
+    def _actualizar(self, hora_actual):
+        # Pasar al heap de largos a quien ya cumplió la espera máxima
+        limite = hora_actual - self.espera_maxima
+        while self._por_llegada and self._por_llegada[0][0] <= limite:
+            _, orden, desempate, paciente = heapq.heappop(self._por_llegada)
+            if self._estado.get(orden) == self.RECIENTE:
+                self._estado[orden] = self.LARGO
+                heapq.heappush(self._largos, (self._llave(paciente), desempate, orden, paciente))
+
+    def _sacar(self, heap, estado, hora_actual):
+        empatados = []
+        while heap:
+            entrada = heapq.heappop(heap)
+            if self._estado.get(entrada[2]) != estado:
+                continue
+            if empatados and entrada[0] != empatados[0][0]:
+                heapq.heappush(heap, entrada)
+                break
+            empatados.append(entrada)
+        if not empatados:
+            return None
+        elegida = empatados[0]
+        if len(empatados) > 1:
+            # Puntajes iguales: seleccionar_siguiente_paciente los compara en
+            # flotantes, así que el redondeo puede desempatar antes que el orden
+            elegida = max(empatados, key=lambda e: e[3].calcular_puntaje(hora_actual))
+            for entrada in empatados:
+                if entrada is not elegida:
+                    heapq.heappush(heap, entrada)
+        del self._estado[elegida[2]]
+        self._en_cola -= 1
+        return elegida[3]
+
+    def siguiente(self, hora_actual):
+        """Saca y regresa al siguiente paciente a atender, o None si no hay nadie."""
+        self._actualizar(hora_actual)
+        paciente = self._sacar(self._largos, self.LARGO, hora_actual)
+        if paciente is None:
+            paciente = self._sacar(self._recientes, self.RECIENTE, hora_actual)
+        return paciente
+
+    def retirar(self, orden):
+        """
+        Quita de la cola al paciente con ese número de orden (por ejemplo, si se
+        fue sin ser atendido). Regresa False si ya no estaba en la cola.
+        """
+        if orden not in self._estado:
+            return False
+        # Sus entradas en los heaps se descartan cuando lleguen al frente
+        del self._estado[orden]
+        self._en_cola -= 1
+        return True
+
+    def copiar(self):
+        """Copia independiente de la cola; los pacientes se comparten."""
+        copia = ColaPrioridadDinamica.__new__(ColaPrioridadDinamica)
+        copia.espera_maxima = self.espera_maxima
+        copia._recientes = self._recientes[:]
+        copia._largos = self._largos[:]
+        copia._por_llegada = self._por_llegada[:]
+        copia._estado = dict(self._estado)
+        copia._orden = self._orden
+        copia._en_cola = self._en_cola
+        return copia
+
+
+# Funciones de registro por atención: reciben (hora_inicio, caja, paciente, espera)
+
+def imprimir_atencion(hora_inicio, caja, paciente, espera):
+    print(f"{hora_inicio.time()} | Caja {caja} atiende ID {paciente.id} "
+          f"(Prioridad {paciente.prioridad_inicial}) - Espera: {espera:.1f} min")
+
+
+def registrar_atencion(hora_inicio, caja, paciente, espera):
+    logger.info("%s | Caja %d atiende ID %s (Prioridad %s) - Espera: %.1f min",
+                hora_inicio.time(), caja, paciente.id, paciente.prioridad_inicial, espera)
+
+
+class ResultadosAtencion:
+    """
+    Resultados de una simulación en arreglos de NumPy reservados de antemano.
+
+    El DataFrame se arma una sola vez al final, con las mismas columnas que
+    llenaba simular_atencion fila por fila.
+    """
+
+    def __init__(self, df_sim):
+        import numpy as np
+
+        def tipo_numpy(tipo):
+            # category, Int8 y demás tipos de extensión de pandas no son de NumPy
+            return tipo if isinstance(tipo, np.dtype) else object
+
+        n = len(df_sim)
+        tipo_fecha = df_sim["FechaHoraSimulada"].dtype if "FechaHoraSimulada" in df_sim else "datetime64[ns]"
+        self.id = np.empty(n, dtype=tipo_numpy(df_sim.index.dtype))
+        self.prioridad = np.empty(n, dtype=tipo_numpy(df_sim["Prioridad"].dtype) if "Prioridad" in df_sim else float)
+        self.hora_llegada = np.empty(n, dtype=tipo_fecha)
+        self.hora_inicio = np.empty(n, dtype=tipo_fecha)
+        self.espera_min = np.empty(n, dtype=float)
+        self.caja = np.empty(n, dtype=np.int64)
+        self.n = 0
+
+    def agregar(self, paciente, hora_inicio, espera, caja):
+        k = self.n
+        self.id[k] = paciente.id
+        self.prioridad[k] = paciente.prioridad_inicial
+        self.hora_llegada[k] = paciente.hora_llegada.to_datetime64()
+        self.hora_inicio[k] = hora_inicio.to_datetime64()
+        self.espera_min[k] = espera
+        self.caja[k] = caja
+        self.n += 1
+
+    def copiar(self):
+        copia = ResultadosAtencion.__new__(ResultadosAtencion)
+        for nombre in ("id", "prioridad", "hora_llegada", "hora_inicio", "espera_min", "caja"):
+            setattr(copia, nombre, getattr(self, nombre).copy())
+        copia.n = self.n
+        return copia
+
+    def a_dataframe(self):
+        import numpy as np
+        import pandas as pd
+
+        def columna(valores):
+            # Los arreglos object (tipos de pandas) toman el tipo de sus
+            # valores, como el DataFrame que armaba simular_atencion por filas
+            if valores.dtype != object:
+                return valores
+            return np.array([v.item() if isinstance(v, np.generic) else v for v in valores])
+
+        n = self.n
+        return pd.DataFrame({
+            "id": columna(self.id[:n]),
+            "prioridad": columna(self.prioridad[:n]),
+            "hora_llegada": self.hora_llegada[:n],
+            "hora_inicio": self.hora_inicio[:n],
+            "espera_min": self.espera_min[:n],
+            "caja": self.caja[:n],
+        })
+
+
 # Función para simular atención a pacientes con cajas por sucursal
 
-def simular_atencion(df_sim, cajas):
-    resultados = []
+def simular_atencion(df_sim, cajas, verbose=True, registro=None):
+    """
+    Con verbose=False no se imprime nada. `registro` es una función opcional
+    que recibe (hora_inicio, caja, paciente, espera) por cada atención, por
+    ejemplo registrar_atencion para mandarlo a logging.
+    """
+    if registro is None and verbose:
+        registro = imprimir_atencion
+    resultados = ResultadosAtencion(df_sim)
     # Crear objetos Paciente
     pacientes = [
         Paciente(
@@ -50,6 +258,8 @@ def simular_atencion(df_sim, cajas):
     ]
 
     cola = pacientes.copy()
+    if not cola:
+        return resultados.a_dataframe()
     tiempo_actual = min(p.hora_llegada for p in cola)
 
     # Inicializar disponibilidad de cada caja (todas libres desde la hora inicial)
@@ -71,25 +281,197 @@ def simular_atencion(df_sim, cajas):
                 hora_inicio = max(tiempo_actual, siguiente.hora_llegada)
                 espera = (hora_inicio - siguiente.hora_llegada).total_seconds() / 60
 
-                print(f"{hora_inicio.time()} | Caja {i_caja + 1} atiende ID {siguiente.id} "
-                      f"(Prioridad {siguiente.prioridad_inicial}) - Espera: {espera:.1f} min")
+                if registro is not None:
+                    registro(hora_inicio, i_caja + 1, siguiente, espera)
                 
                 # Actualizar disponibilidad de la caja
                 disponibilidad_cajas[i_caja] = hora_inicio + timedelta(minutes=siguiente.tiempo_estimado)
                 
-                resultados.append({
-                        "id": siguiente.id,
-                        "prioridad": siguiente.prioridad_inicial,
-                        "hora_llegada": siguiente.hora_llegada,
-                        "hora_inicio": tiempo_actual,
-                        "espera_min": espera,
-                        "caja": i_caja + 1
-                    })
+                resultados.agregar(siguiente, tiempo_actual, espera, i_caja + 1)
                 
                 # Eliminar paciente de la cola
                 cola.remove(siguiente)
                 pacientes_actuales.remove(siguiente)
 
         tiempo_actual += timedelta(minutes=1)
-        df_resultados = pd.DataFrame(resultados)
-    return df_resultados
+    return resultados.a_dataframe()
+
+
+
+# Misma simulación que simular_atencion, con la cola en heaps
+
+class SimulacionAtencion:
+    """
+    Estado de simular_atencion_heap, para correrla por tramos y bifurcarla:
+
+        sim = SimulacionAtencion(df_sim, cajas=4)
+        sim.avanzar(hasta=pd.Timestamp("2025-05-27 12:00"))
+        punto = sim.punto_control()
+        igual = punto.bifurcar().avanzar()          # mismo resultado que sin cortar
+        una_menos = punto.bifurcar(cajas=3).avanzar()
+
+    Los pacientes no cambian durante la simulación, así que el punto de
+    control y sus bifurcaciones los comparten; sólo se copian la cola, las
+    cajas y los resultados acumulados.
+
+    Con `despachador` (un DespachadorCajas, o cualquier objeto con encolar,
+    caja_libre, retirar y len) la cola es la suya, y `salidas` es una lista
+    ordenada de (hora, id de paciente) de quienes se van sin ser atendidos;
+    así corre reproducir_dia.
+    """
+
+    def __init__(self, df_sim, cajas, registro=None, despachador=None, salidas=()):
+        if salidas and despachador is None:
+            raise ValueError("Las salidas necesitan un despachador que las retire")
+        self.registro = registro
+        self.despachador = despachador
+        self.salidas = list(salidas)
+        self.siguiente_salida = 0
+        pacientes = [
+            Paciente(
+                id=i,
+                sucursal=sucursal,
+                hora_llegada=hora_llegada,
+                prioridad=prioridad,
+                tiempo_estimado=tiempo_estimado,
+            )
+            for i, sucursal, hora_llegada, prioridad, tiempo_estimado in zip(
+                df_sim.index,
+                df_sim["Sucursal"],
+                df_sim["FechaHoraSimulada"],
+                df_sim["Prioridad"],
+                df_sim["TAPRecepcionMinutos"],
+            )
+        ]
+        # Por hora de llegada; la posición en el DataFrame desempata en la cola
+        self.posiciones = sorted(range(len(pacientes)), key=lambda k: pacientes[k].hora_llegada)
+        self.pacientes = [pacientes[k] for k in self.posiciones]
+
+        self.resultados = ResultadosAtencion(df_sim)
+        self.hora_cero = self.pacientes[0].hora_llegada if self.pacientes else None
+        self.tiempo_actual = self.hora_cero
+        self.disponibilidad_cajas = [self.tiempo_actual for _ in range(cajas)]
+        self.cola = ColaPrioridadDinamica()
+        self.siguiente_llegada = 0
+
+    def avanzar(self, hasta=None):
+        """
+        Atiende hasta antes del minuto `hasta` (por omisión, hasta vaciar la
+        cola) y regresa el DataFrame de simular_atencion con lo atendido.
+        """
+        if self.hora_cero is None:
+            return self.resultados.a_dataframe()
+        minuto = 60_000_000_000  # en nanosegundos
+        hora_cero = self.hora_cero
+        pacientes = self.pacientes
+        posiciones = self.posiciones
+        salidas = self.salidas
+        despachador = self.despachador
+        if despachador is None:
+            cola = self.cola
+            encolar = cola.agregar
+            atender = lambda caja, ahora: cola.siguiente(ahora)  # noqa: E731
+        else:
+            cola = despachador
+            encolar = despachador.encolar
+            atender = despachador.caja_libre
+        disponibilidad_cajas = self.disponibilidad_cajas
+        resultados = self.resultados
+        registro = self.registro
+        tiempo_actual = self.tiempo_actual
+        siguiente_llegada = self.siguiente_llegada
+        siguiente_salida = self.siguiente_salida
+        limite = None
+        if hasta is not None:
+            # Primer minuto de la simulación que ya no se atiende
+            limite = hora_cero + timedelta(minutes=max(0, -(-(hasta - hora_cero).value // minuto)))
+
+        while (siguiente_llegada < len(pacientes) or len(cola)) and (limite is None or tiempo_actual < limite):
+            while (
+                siguiente_llegada < len(pacientes)
+                and pacientes[siguiente_llegada].hora_llegada <= tiempo_actual
+            ):
+                encolar(pacientes[siguiente_llegada], posiciones[siguiente_llegada])
+                siguiente_llegada += 1
+            while siguiente_salida < len(salidas) and salidas[siguiente_salida][0] <= tiempo_actual:
+                despachador.retirar(salidas[siguiente_salida][1])
+                siguiente_salida += 1
+
+            for i_caja, libre_hasta in enumerate(disponibilidad_cajas):
+                if libre_hasta > tiempo_actual:
+                    continue
+                siguiente = atender(i_caja + 1, tiempo_actual)
+                if siguiente is None:
+                    break
+                espera = (tiempo_actual - siguiente.hora_llegada).total_seconds() / 60
+                if registro is not None:
+                    registro(tiempo_actual, i_caja + 1, siguiente, espera)
+                disponibilidad_cajas[i_caja] = tiempo_actual + timedelta(minutes=siguiente.tiempo_estimado)
+                resultados.agregar(siguiente, tiempo_actual, espera, i_caja + 1)
+
+            # Siguiente minuto en el que hay a la vez una caja libre y alguien en cola
+            objetivo = min(disponibilidad_cajas, default=None)
+            if not len(cola):
+                if siguiente_llegada == len(pacientes):
+                    break
+                llegada = pacientes[siguiente_llegada].hora_llegada
+                objetivo = llegada if objetivo is None else max(objetivo, llegada)
+            if objetivo is None:
+                # Sin cajas abiertas sólo queda esperar al corte
+                if limite is None:
+                    break
+                objetivo = limite
+            minutos = max(1, -(-(objetivo - hora_cero).value // minuto) - (tiempo_actual - hora_cero).value // minuto)
+            tiempo_actual += timedelta(minutes=minutos)
+            if limite is not None:
+                # Visitar el corte de más no cambia nada: nadie podía ser atendido antes
+                tiempo_actual = min(tiempo_actual, limite)
+
+        self.tiempo_actual = tiempo_actual
+        self.siguiente_llegada = siguiente_llegada
+        self.siguiente_salida = siguiente_salida
+        return resultados.a_dataframe()
+
+    def punto_control(self):
+        """Copia del estado actual que se puede bifurcar varias veces."""
+        return self.bifurcar()
+
+    def bifurcar(self, cajas=None, registro=None):
+        """
+        Simulación independiente que sigue desde el estado actual con `cajas`
+        cajas (por omisión, las mismas). Las cajas que se cierran son las de
+        número más alto y terminan de atender a su paciente; las que se abren
+        quedan libres desde ahora. No aplica con un despachador en vivo.
+        """
+        if self.despachador is not None:
+            raise ValueError("No se puede bifurcar una simulación con despachador")
+        copia = SimulacionAtencion.__new__(SimulacionAtencion)
+        copia.registro = registro
+        copia.despachador = None
+        copia.salidas = []
+        copia.siguiente_salida = 0
+        copia.pacientes = self.pacientes
+        copia.posiciones = self.posiciones
+        copia.hora_cero = self.hora_cero
+        copia.tiempo_actual = self.tiempo_actual
+        copia.siguiente_llegada = self.siguiente_llegada
+        copia.cola = self.cola.copiar()
+        copia.resultados = self.resultados.copiar()
+        cajas = len(self.disponibilidad_cajas) if cajas is None else cajas
+        copia.disponibilidad_cajas = self.disponibilidad_cajas[:cajas] + [
+            self.tiempo_actual for _ in range(cajas - len(self.disponibilidad_cajas))
+        ]
+        return copia
+
+
+def simular_atencion_heap(df_sim, cajas, registro=None):
+    """
+    Regresa el mismo DataFrame que simular_atencion con verbose=False.
+
+    Usa ColaPrioridadDinamica en lugar de recorrer la cola completa, y salta
+    directo al siguiente minuto en el que una caja libre puede atender a alguien
+    en lugar de avanzar de minuto en minuto. `registro` funciona igual que en
+    simular_atencion. Para cortar el día y probar otras cajas a partir de una
+    hora, ver SimulacionAtencion.
+    """
+    return SimulacionAtencion(df_sim, cajas, registro).avanzar()
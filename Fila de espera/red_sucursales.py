@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Jun 19 16:20:54 2025
+
+@author: Equipo 6
+
+Simulación de toda la red de sucursales, en paralelo por sucursal y día:
+
+    red = simular_red({"COYOACAN": 10, "CULIACAN": 7}, df, "2025-05-27", dias=30,
+                      locales_por_sucursal={"COYOACAN": studies_definitions})
+    red["resumen"]
+
+Cada sucursal y día se simula por separado en un proceso; los resultados se
+juntan en DataFrames largos y en un resumen con percentiles de espera y tasa
+de incumplimiento de la meta de 20 minutos, por sucursal y para toda la red.
+Las sucursales con locales usan los simuladores de "Ruta optima", que quien
+llama debe tener en sys.path (como batch/run_scenarios.py).
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from prioridad_dinamica import simular_atencion_heap
+from simulaciones import simulacion_pacientes_vectorizada
+
+ESPERA_MAXIMA = 20  # minutos
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+def _ruta_optima():
+    """Importa los simuladores de Ruta optima solo cuando se piden locales."""
+    from admission_schedule import AdmissionSchedule
+    from event_engine import simulate_workflow_events
+    from replications import generate_patients
+    from router import get_fastest_study_dp
+
+    return AdmissionSchedule, simulate_workflow_events, generate_patients, get_fastest_study_dp
+
+
+def _simular_sucursal_dia(trabajo):
+    (sucursal, dia, df_dia, cajas, study_defs, semilla_ruta,
+     estudios, lookahead, inicio_dia) = trabajo
+
+    atencion = simular_atencion_heap(df_dia.reset_index(drop=True), cajas)
+    atencion.insert(0, "Dia", dia)
+    atencion.insert(0, "Sucursal", sucursal)
+
+    ruta = None
+    if study_defs is not None:
+        AdmissionSchedule, simulate_workflow_events, generate_patients, router = _ruta_optima()
+        rng = np.random.default_rng(semilla_ruta)
+        # Nadie puede tener más estudios de los que hay en la sucursal
+        maximo = min(estudios[1], len(study_defs))
+        minimo = min(estudios[0], maximo)
+        pacientes = generate_patients(rng, len(df_dia), study_defs, minimo, maximo)
+        # Los pacientes entran a estudios a la misma hora en que llegaron a la sucursal
+        llegadas = AdmissionSchedule.from_arrivals(df_dia["FechaHoraSimulada"], inicio_dia)
+        final = simulate_workflow_events(
+            router, pacientes, study_defs, llegadas.time_period, llegadas,
+            show_steps=False, lookahead=lookahead,
+        )
+        completados = {id(p) for p in final["completed_patients"]}
+        ruta = pd.DataFrame({
+            "Sucursal": sucursal,
+            "Dia": dia,
+            "paciente": [p.id_num for p in pacientes],
+            "estudios": [len(p.required_studies_orig) for p in pacientes],
+            "espera_min": [p.total_wait_time for p in pacientes],
+            "completado": [id(p) in completados for p in pacientes],
+        })
+    return atencion, ruta
+
+
+def resumen_esperas(df, espera_maxima=ESPERA_MAXIMA, columna="espera_min"):
+    """
+    Pacientes, espera media, percentiles, máximo y tasa de incumplimiento
+    (espera > espera_maxima) por sucursal, más una fila "RED" con todos.
+    """
+
+    def resumir(esperas):
+        fila = {
+            "pacientes": len(esperas),
+            "espera_media": esperas.mean(),
+            **{f"p{round(q * 100)}": esperas.quantile(q) for q in PERCENTILES},
+            "espera_maxima": esperas.max(),
+            "incumplimiento": (esperas > espera_maxima).mean(),
+        }
+        return pd.Series(fila)
+
+    por_sucursal = df.groupby("Sucursal", observed=True)[columna].apply(resumir).unstack()
+    red = resumir(df[columna]).to_frame("RED").T
+    resumen = pd.concat([por_sucursal, red])
+    resumen["pacientes"] = resumen["pacientes"].astype(int)
+    resumen.index.name = "Sucursal"
+    return resumen
+
+
+def simular_red(
+    cajas_por_sucursal,
+    df,
+    fechabase,
+    dias=1,
+    locales_por_sucursal=None,
+    perfiles=None,
+    semilla=0,
+    estudios=(1, 7),
+    lookahead=1,
+    espera_maxima=ESPERA_MAXIMA,
+    max_workers=None,
+):
+    """
+    Simula `dias` días de todas las sucursales de cajas_por_sucursal.
+
+    Las llegadas de cada sucursal salen de simulacion_pacientes_vectorizada
+    (con `perfiles` si se da) y la fila de cajas se atiende con
+    simular_atencion_heap. locales_por_sucursal mapea sucursal -> study_defs
+    de Ruta optima; esas sucursales además recorren sus estudios con
+    simulate_workflow_events, con un número de estudios por paciente entre
+    estudios[0] y estudios[1] (a lo más los de su sucursal) y entrando a la
+    hora de su llegada.
+
+    La misma `semilla` da los mismos resultados sin importar max_workers;
+    max_workers=1 corre todo en este proceso.
+
+    Regresa un dict con "atencion" (una fila por paciente en caja), "ruta"
+    (una fila por paciente en estudios, o None), "resumen" y "resumen_ruta".
+    """
+    locales_por_sucursal = locales_por_sucursal or {}
+    sucursales = list(cajas_por_sucursal)
+    semillas = np.random.SeedSequence(semilla).spawn(len(sucursales))
+    fecha_base = pd.to_datetime(fechabase).normalize()
+
+    trabajos = []
+    for sucursal, semilla_sucursal in zip(sucursales, semillas):
+        semilla_llegadas, semilla_ruta = semilla_sucursal.spawn(2)
+        df_sim = simulacion_pacientes_vectorizada(
+            sucursal, df, fecha_base, dias=dias,
+            rng=np.random.default_rng(semilla_llegadas), perfiles=perfiles,
+        )
+        semillas_ruta = semilla_ruta.spawn(dias)
+        for dia, df_dia in df_sim.groupby("Dia"):
+            trabajos.append((
+                sucursal, dia, df_dia, cajas_por_sucursal[sucursal],
+                locales_por_sucursal.get(sucursal), semillas_ruta[dia],
+                estudios, lookahead, fecha_base + pd.Timedelta(days=dia),
+            ))
+
+    if max_workers == 1:
+        salidas = [_simular_sucursal_dia(trabajo) for trabajo in trabajos]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            salidas = list(executor.map(_simular_sucursal_dia, trabajos))
+
+    atencion = pd.concat([a for a, _ in salidas], ignore_index=True)
+    atencion["Sucursal"] = pd.Categorical(atencion["Sucursal"], categories=sucursales)
+    rutas = [r for _, r in salidas if r is not None]
+    ruta = None
+    resumen_ruta = None
+    if rutas:
+        ruta = pd.concat(rutas, ignore_index=True)
+        ruta["Sucursal"] = pd.Categorical(ruta["Sucursal"], categories=sucursales)
+        resumen_ruta = resumen_esperas(ruta[ruta["completado"]], espera_maxima)
+
+    return {
+        "atencion": atencion,
+        "ruta": ruta,
+        "resumen": resumen_esperas(atencion, espera_maxima),
+        "resumen_ruta": resumen_ruta,
+    }
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Jun 27 09:48:33 2025
+
+@author: Equipo 6
+
+Réplicas de simular_atencion que se detienen solas cuando la espera media
+y el percentil 95 ya están bien estimados (ver adaptive.py en Ruta optima):
+
+    corridas, resumen = replicas_adaptativas("COYOACAN", df, "2025-05-27",
+                                             cajas=[8, 9, 10], base=10)
+
+adaptive.py se importa de "Ruta optima", que quien llama debe tener en
+sys.path (como batch/run_scenarios.py).
+"""
+
+from functools import partial
+
+import numpy as np
+
+from prioridad_dinamica import simular_atencion_heap
+from simulaciones import simulacion_pacientes_vectorizada
+
+
+def _replica_atencion(cajas, semillas, sucursal, df, fechabase, perfiles):
+    # Mismo día simulado para todas las opciones de cajas de una réplica
+    df_sim = simulacion_pacientes_vectorizada(
+        sucursal, df, fechabase, rng=np.random.default_rng(semillas), perfiles=perfiles
+    )
+    return simular_atencion_heap(df_sim, cajas)["espera_min"].to_numpy()
+
+
+def replicas_adaptativas(
+    sucursal, df, fechabase, cajas, perfiles=None, base=None, semilla=0, **opciones
+):
+    """
+    sequential_replications con un escenario por número de cajas.
+
+    En la réplica r todas las opciones de cajas atienden las mismas llegadas,
+    así que sus diferencias convergen más rápido. `base` es el número de cajas
+    contra el que se compara la espera media y `semilla` es la semilla (seed)
+    de las réplicas; las demás opciones (rel_precision, max_replications,
+    max_workers...) van directo a sequential_replications.
+    """
+    from adaptive import sequential_replications
+
+    run = partial(
+        _replica_atencion, sucursal=sucursal, df=df, fechabase=fechabase, perfiles=perfiles
+    )
+    return sequential_replications(run, list(cajas), seed=semilla, baseline=base, **opciones)
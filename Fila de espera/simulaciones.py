@@ -10,23 +10,19 @@ import pandas as pd
 from datetime import timedelta
 
 
-def simulacion_pacientes(sucursal, df,fechabase):
-    df_sucursal = df[df["Sucursal"] == sucursal].copy()
-
-    # Calcular llegadas promedio por hora del día (0-23)
-    llegadas_por_hora_promedio = (
-        df_sucursal.groupby(df_sucursal["FechaHoraLLegada"].dt.hour)
-        .size()
-        / df_sucursal["FechaHoraLLegada"].dt.date.nunique()
-    )
+def simulacion_pacientes(sucursal, df,fechabase, perfiles=None):
+    # Llegadas promedio por hora, prioridades y tiempos reales (de perfiles si se da)
+    if perfiles is not None:
+        tasas, prioridades, tiempos = perfiles.perfil(sucursal)
+    else:
+        tasas, prioridades, tiempos = _perfil_sucursal(sucursal, df)
     
     # Simulación por minuto usando distribución multinomial
 
     horas = np.arange(6, 18)
     simulacion_minuto_a_minuto = {}
 
-    for hora in horas:
-        tasa_hora = llegadas_por_hora_promedio.get(hora, 0)
+    for hora, tasa_hora in zip(horas, tasas):
         llegadas_totales = np.random.poisson(tasa_hora)
         llegadas_minuto = np.random.multinomial(llegadas_totales, [1/60]*60)
         simulacion_minuto_a_minuto[hora] = llegadas_minuto
@@ -49,7 +45,6 @@ def simulacion_pacientes(sucursal, df,fechabase):
 
     
     # Distribución real de prioridad
-    prioridades = df_sucursal["Prioridad"].value_counts(normalize=True)
     df_sim["Prioridad"] = np.random.choice(
         prioridades.index,
         size=len(df_sim),
@@ -58,7 +53,89 @@ def simulacion_pacientes(sucursal, df,fechabase):
 
     # Tiempo de atención basado en datos reales
     df_sim["TAPRecepcionMinutos"] = np.random.choice(
-        df_sucursal["TAPRecepcionMinutos"].dropna(),
+        tiempos,
         size=len(df_sim)
     )
-    return df_sim
\ No newline at end of file
+    return df_sim
+
+# Horas del día en las que se simulan llegadas (6:00 a 17:59)
+HORAS_SIMULADAS = np.arange(6, 18)
+
+
+def _perfil_sucursal(sucursal, df):
+    """Tasas de llegada por hora, distribución de prioridad y tiempos de atención reales."""
+    return _perfil(df[df["Sucursal"] == sucursal])
+
+
+def _perfil(df_sucursal):
+    llegadas_por_hora_promedio = (
+        df_sucursal.groupby(df_sucursal["FechaHoraLLegada"].dt.hour)
+        .size()
+        / df_sucursal["FechaHoraLLegada"].dt.date.nunique()
+    )
+    tasas = np.array(
+        [llegadas_por_hora_promedio.get(hora, 0) for hora in HORAS_SIMULADAS],
+        dtype=float,
+    )
+    prioridades = df_sucursal["Prioridad"].value_counts(normalize=True)
+    tiempos = df_sucursal["TAPRecepcionMinutos"].dropna().to_numpy()
+    return tasas, prioridades, tiempos
+
+
+def simulacion_pacientes_vectorizada(sucursales, df, fechabase, dias=1, rng=None, perfiles=None):
+    """
+    Misma simulación que simulacion_pacientes, sin ciclos por paciente.
+
+    Genera `dias` días consecutivos a partir de `fechabase` para una o varias
+    sucursales en una sola llamada. Todas las llegadas por hora (Poisson) y su
+    reparto por minuto (multinomial) se sortean de una vez y los timestamps se
+    expanden con np.repeat sobre una malla de minutos datetime64.
+
+    Regresa un solo DataFrame largo con la columna "Dia" (0 .. dias-1) para
+    separar las réplicas. Sin `rng` se usa un generador sembrado desde
+    np.random, así que np.random.seed sigue haciendo reproducible la corrida.
+
+    Con `perfiles` (un AlmacenPerfiles) los datos de cada sucursal se toman
+    de ahí en vez de recalcularse desde `df`, que entonces puede ser None.
+    """
+    if isinstance(sucursales, str):
+        sucursales = [sucursales]
+    if rng is None:
+        rng = np.random.default_rng(np.random.randint(2**32, dtype=np.uint64))
+
+    if perfiles is not None:
+        perfiles = [perfiles.perfil(sucursal) for sucursal in sucursales]
+    else:
+        perfiles = [_perfil_sucursal(sucursal, df) for sucursal in sucursales]
+    tasas = np.array([perfil[0] for perfil in perfiles])  # (sucursales, horas)
+
+    # Llegadas por hora y por minuto: (sucursales, dias, horas, 60)
+    llegadas_hora = rng.poisson(tasas[:, None, :], size=(len(sucursales), dias, len(HORAS_SIMULADAS)))
+    llegadas_minuto = rng.multinomial(llegadas_hora, [1 / 60] * 60)
+
+    # Minuto (desde fechabase) de cada celda de la malla, en el mismo orden
+    minutos_dia = (HORAS_SIMULADAS[:, None] * 60 + np.arange(60)[None, :]).ravel()
+    minutos = (np.arange(dias)[:, None] * 24 * 60 + minutos_dia[None, :]).ravel()
+    fecha_base = np.datetime64(pd.to_datetime(fechabase), "m")
+
+    conteos = llegadas_minuto.reshape(len(sucursales), -1)
+    por_sucursal = conteos.sum(axis=1)
+    minuto_llegada = np.concatenate([np.repeat(minutos, fila) for fila in conteos])
+    dia = minuto_llegada // (24 * 60)
+
+    prioridad = []
+    tiempo_atencion = []
+    for (_, prioridades, tiempos), n in zip(perfiles, por_sucursal):
+        # Distribución real de prioridad y tiempo de atención basado en datos reales
+        prioridad.append(rng.choice(prioridades.index.to_numpy(), size=n, p=prioridades.values))
+        tiempo_atencion.append(rng.choice(tiempos, size=n))
+
+    return pd.DataFrame({
+        "Sucursal": pd.Categorical.from_codes(
+            np.repeat(np.arange(len(sucursales)), por_sucursal), categories=sucursales
+        ),
+        "Dia": dia,
+        "FechaHoraSimulada": (fecha_base + minuto_llegada.astype("timedelta64[m]")).astype("datetime64[ns]"),
+        "Prioridad": np.concatenate(prioridad),
+        "TAPRecepcionMinutos": np.concatenate(tiempo_atencion),
+    })
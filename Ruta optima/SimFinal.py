@@ -1,11 +1,17 @@
 import math
 import random
+import time
+from collections import deque
 from copy import deepcopy
-from typing import List, Dict, Any
-import numpy as np
+from typing import List, Dict, Any, Callable
+
+from admission_schedule import AdmissionSchedule, as_schedule
+from workflow_profile import WorkflowProfile
 
 
 class Study:
+    __slots__ = ("name", "locales", "time")
+
     def __init__(self, name: str, locales: int, time: int):
         self.name = name
         self.locales = locales  # Total number of stations/locales for this study
@@ -17,6 +23,15 @@ class Study:
 
 
 class Patient:
+    __slots__ = (
+        "required_studies_orig",
+        "studies_remaining",
+        "id_num",
+        "completed_studies",
+        "total_wait_time",
+        "time_entered_current_queue",
+    )
+
     def __init__(self, studies: List[Study], id_num: int):
         self.required_studies_orig = studies
         self.studies_remaining = studies[:]
@@ -57,27 +72,67 @@ def get_current_mean_admission_rate(
     return default_rate
 
 
+def _report_step(step_callback, time_step, lines, active_sessions, waiting_queues, completed_patients):
+    step_callback(
+        time_step,
+        lines,
+        [len(sessions) for sessions in active_sessions.values()],
+        len(completed_patients),
+        [
+            time_step - queue[0][1].time_entered_current_queue if queue else math.nan
+            for queue in waiting_queues.values()
+        ],
+    )
+
+
 def simulate_workflow(
     get_fastest_study_func, # Renamed to avoid conflict with the helper function below if it's in the same scope
     initial_patient_list: List[Patient],
     study_defs: Dict[str, Study],
     time_period: int,
-    admission_schedule: Dict[tuple, float] = None,
+    admission_schedule: Dict[tuple, float] | AdmissionSchedule = None,
     default_initial_admission_rate: float = 1.0,
     show_steps: bool = True,
     lookahead=1,
+    profile: bool = False,
+    step_callback: Callable = None,
 ):
+    """
+    With profile=True the result dict also has a "profile" entry (see
+    WorkflowProfile) with the time spent in each phase, the router calls and
+    their latencies, and the longest line of each study. Profiling is off by
+    default and costs nothing then.
+
+    step_callback, if given, is called at the end of every time step with
+    (time_step, lines, active sessions per study, patients completed so far,
+    minutes the head of each line has waited); see step_metrics.StepMetrics.
+    """
+    if profile:
+        workflow_profile = WorkflowProfile(study_defs.keys())
+        get_fastest_study_func = workflow_profile.timed_router(get_fastest_study_func)
     patient_arrival_queue = initial_patient_list[:]
-    waiting_patients: List[Dict[str, Any]] = []
+    # One FIFO line per study holding (entry order, patient, assigned study)
+    waiting_queues: Dict[str, deque] = {name: deque() for name in study_defs.keys()}
+    free_locales: Dict[str, int] = {
+        name: study.locales for name, study in study_defs.items()
+    }
+    entry_order = 0
     active_sessions: Dict[str, List[Dict[str, Any]]] = {
         name: [] for name in study_defs.keys()
     }
     lines: Dict[str, int] = {name: 0 for name in study_defs.keys()}
     completed_patients: List[Patient] = []
+    if admission_schedule:
+        # Per-minute rates are looked up once instead of scanning the dict every step
+        compiled_schedule = as_schedule(
+            admission_schedule, time_period, default_initial_admission_rate
+        )
 
     for time_step in range(time_period):
         if show_steps:
             print(f"\n--- Time Step: {time_step} ---")
+        if profile:
+            phase_start = time.perf_counter()
 
         # 1. Process Active Sessions (Decrement time, handle completions)
         if show_steps: print(" Processing Active Sessions:")
@@ -100,15 +155,17 @@ def simulate_workflow(
             # Remove finished sessions from active_sessions
             for i in sorted(finished_indices, reverse=True):
                 del active_sessions[study_name][i]
+            free_locales[study_name] += len(finished_indices)
+        if profile:
+            phase_start = workflow_profile.end_phase("process_sessions", phase_start)
 
         # 2. Assign Waiting Patients to Free Locales
         if show_steps: print(" Assigning Waiting Patients:")
-        moved_from_waiting_indices = []
-        for i, wait_info in enumerate(waiting_patients):
-            patient = wait_info["patient"]
-            assigned_study = wait_info["assigned_study"]
-            study_name = assigned_study.name
-            if len(active_sessions[study_name]) < study_defs[study_name].locales:
+        # Only the heads of lines with a free locale are looked at, so the cost
+        # depends on the free locales and not on how long the lines are.
+        for study_name, queue in waiting_queues.items():
+            while queue and free_locales[study_name] > 0:
+                _, patient, assigned_study = queue.popleft()
                 # Patient is moving from a specific study queue to an active session.
                 # Calculate wait time for this specific queue.
                 if patient.time_entered_current_queue != -1.0: # -1.0 indicates not in a queue (e.g. active)
@@ -127,12 +184,11 @@ def simulate_workflow(
                         "remaining_time": assigned_study.time,
                     }
                 )
-                moved_from_waiting_indices.append(i)
+                free_locales[study_name] -= 1
                 lines[study_name] -= 1
                 if show_steps: print(f"  Patient {patient.id_num} started {study_name}.")
-        # Remove assigned patients from waiting_patients
-        for i in sorted(moved_from_waiting_indices, reverse=True):
-            del waiting_patients[i]
+        if profile:
+            phase_start = workflow_profile.end_phase("assign_waiting", phase_start)
 
         # 3. Re-assign Patients who just finished a study
         if show_steps: print(" Re-assigning Patients who finished a study:")
@@ -145,26 +201,20 @@ def simulate_workflow(
                 # Patient is entering a new specific study queue.
                 patient.time_entered_current_queue = float(time_step) # Mark entry time into this new queue
                 
-                waiting_patients.append(
-                    {"patient": patient, "assigned_study": next_study}
-                )
+                entry_order += 1
+                waiting_queues[next_study.name].append((entry_order, patient, next_study))
                 lines[next_study.name] = lines.get(next_study.name, 0) + 1
                 if show_steps: print(f"  Patient {patient.id_num} now waiting for {next_study.name}.")
             # else: # No next study available (e.g., all locales full or no studies left that can be done)
                 # if show_steps: print(f"  Patient {patient.id_num} has no available next study right now.")
-
+        if profile:
+            phase_start = workflow_profile.end_phase("reassign_finished", phase_start)
 
         # 4. Admit New Patients from Arrival Queue
         if show_steps: print(" Admitting New Patients:")
         num_to_attempt_admission = 0
         if admission_schedule:
-            mean_rate_this_step = get_current_mean_admission_rate(
-                time_step, admission_schedule, default_initial_admission_rate
-            )
-            if mean_rate_this_step > 0:
-                num_to_attempt_admission = np.random.poisson(lam=mean_rate_this_step)
-            else:
-                num_to_attempt_admission = 0
+            num_to_attempt_admission = compiled_schedule.admissions_at(time_step)
         else:
             num_to_attempt_admission = int(default_initial_admission_rate)
 
@@ -196,8 +246,9 @@ def simulate_workflow(
                 # The wait for *this* queue will be calculated in Section 2.
                 current_patient.time_entered_current_queue = float(time_step)
                 
-                waiting_patients.append(
-                    {"patient": current_patient, "assigned_study": fastest_study}
+                entry_order += 1
+                waiting_queues[fastest_study.name].append(
+                    (entry_order, current_patient, fastest_study)
                 )
                 lines[fastest_study.name] = lines.get(fastest_study.name, 0) + 1
                 patient_arrival_queue.pop(idx) # Remove from arrival queue
@@ -206,11 +257,17 @@ def simulate_workflow(
             else: # Cannot find a study for this patient from arrival queue yet
                 idx += 1
                 if show_steps: print(f"  Patient {current_patient.id_num} in arrival queue, no study assigned yet.")
+        if profile:
+            workflow_profile.end_phase("admit_arrivals", phase_start)
+            # Lines only grow in phases 3 and 4, so the end of a step sees every peak
+            workflow_profile.observe_lines(lines)
+        if step_callback is not None:
+            _report_step(step_callback, time_step, lines, active_sessions, waiting_queues, completed_patients)
         
         if show_steps:
             print(f"  End of Time Step {time_step}:")
             print(f"    Arrival Queue: {len(patient_arrival_queue)}")
-            print(f"    Waiting Patients: {len(waiting_patients)}")
+            print(f"    Waiting Patients: {sum(len(q) for q in waiting_queues.values())}")
             print(f"    Active Sessions: {sum(len(s) for s in active_sessions.values())}")
             print(f"    Completed Patients: {len(completed_patients)}")
             print(f"    Current Lines: {lines}")
@@ -226,10 +283,14 @@ def simulate_workflow(
     else:
         average_wait_time_completed = 0.0
 
-    return {
+    final_state = {
         "completed_patients": completed_patients,
         "waiting_patients_final_state_objects": [
-            wp["patient"] for wp in waiting_patients
+            patient
+            for _, patient, _ in sorted(
+                (entry for queue in waiting_queues.values() for entry in queue),
+                key=lambda entry: entry[0],
+            )
         ],
         "active_sessions_final_state_patients": [
             s["patient"] for sessions in active_sessions.values() for s in sessions
@@ -238,23 +299,37 @@ def simulate_workflow(
         "still_in_arrival_queue": patient_arrival_queue,
         "average_wait_time_completed": average_wait_time_completed,
     }
+    if profile:
+        final_state["profile"] = workflow_profile.to_dict()
+    return final_state
 
 
 def simulate_workflow_random(
     initial_patient_list: List[Patient],
     study_defs: Dict[str, Study],
     time_period: int,
-    admission_schedule: Dict[tuple, float] = None,
+    admission_schedule: Dict[tuple, float] | AdmissionSchedule = None,
     default_initial_admission_rate: float = 1.0,
     show_steps: bool = True,
+    step_callback: Callable = None,
 ):
     patient_arrival_queue = initial_patient_list[:]
-    waiting_patients: List[Dict[str, Any]] = []
+    # One FIFO line per study holding (entry order, patient, assigned study)
+    waiting_queues: Dict[str, deque] = {name: deque() for name in study_defs.keys()}
+    free_locales: Dict[str, int] = {
+        name: study.locales for name, study in study_defs.items()
+    }
+    entry_order = 0
     active_sessions: Dict[str, List[Dict[str, Any]]] = {
         name: [] for name in study_defs.keys()
     }
     lines: Dict[str, int] = {name: 0 for name in study_defs.keys()}
     completed_patients: List[Patient] = []
+    if admission_schedule:
+        # Per-minute rates are looked up once instead of scanning the dict every step
+        compiled_schedule = as_schedule(
+            admission_schedule, time_period, default_initial_admission_rate
+        )
 
     for time_step in range(time_period):
         # (Sections 1, 2, 3 are similar to simulate_workflow with appropriate wait time logic)
@@ -275,17 +350,12 @@ def simulate_workflow_random(
                         completed_patients.append(patient)
             for i in sorted(finished_indices, reverse=True):
                 del active_sessions[study_name][i]
+            free_locales[study_name] += len(finished_indices)
 
         # 2. Assign Waiting Patients to Free Locales
-        moved_from_waiting_indices = []
-        for i, wait_info in enumerate(waiting_patients):
-            patient = wait_info["patient"]
-            assigned_study = wait_info["assigned_study"]
-            study_name = assigned_study.name
-            if (
-                study_name in study_defs # Ensure study_name is valid
-                and len(active_sessions[study_name]) < study_defs[study_name].locales
-            ):
+        for study_name, queue in waiting_queues.items():
+            while queue and free_locales[study_name] > 0:
+                _, patient, assigned_study = queue.popleft()
                 if patient.time_entered_current_queue != -1.0:
                     wait_duration = (
                         float(time_step) - patient.time_entered_current_queue
@@ -299,10 +369,8 @@ def simulate_workflow_random(
                         "remaining_time": assigned_study.time,
                     }
                 )
-                moved_from_waiting_indices.append(i)
+                free_locales[study_name] -= 1
                 lines[study_name] -= 1
-        for i in sorted(moved_from_waiting_indices, reverse=True):
-            del waiting_patients[i]
 
         # 3. Re-assign Patients who just finished a study (RANDOM choice)
         for patient in patients_finished_study_this_step:
@@ -317,21 +385,16 @@ def simulate_workflow_random(
                 if performable_studies:
                     next_study_obj = random.choice(performable_studies)
                     patient.time_entered_current_queue = float(time_step) # Entering new specific queue
-                    waiting_patients.append(
-                        {"patient": patient, "assigned_study": next_study_obj}
+                    entry_order += 1
+                    waiting_queues[next_study_obj.name].append(
+                        (entry_order, patient, next_study_obj)
                     )
                     lines[next_study_obj.name] = lines.get(next_study_obj.name, 0) + 1
         
         # 4. Admit New Patients from Arrival Queue (MODIFIED PART for probabilistic admission)
         num_to_attempt_admission = 0
         if admission_schedule:
-            mean_rate_this_step = get_current_mean_admission_rate(
-                time_step, admission_schedule, default_initial_admission_rate
-            )
-            if mean_rate_this_step > 0:
-                num_to_attempt_admission = np.random.poisson(lam=mean_rate_this_step)
-            else:
-                num_to_attempt_admission = 0
+            num_to_attempt_admission = compiled_schedule.admissions_at(time_step)
         else:
             num_to_attempt_admission = int(default_initial_admission_rate)
 
@@ -361,8 +424,9 @@ def simulate_workflow_random(
                     # Set time_entered_current_queue for the first specific study queue.
                     current_patient.time_entered_current_queue = float(time_step)
                     
-                    waiting_patients.append(
-                        {"patient": current_patient, "assigned_study": chosen_study_obj}
+                    entry_order += 1
+                    waiting_queues[chosen_study_obj.name].append(
+                        (entry_order, current_patient, chosen_study_obj)
                     )
                     lines[chosen_study_obj.name] = (
                         lines.get(chosen_study_obj.name, 0) + 1
@@ -373,6 +437,8 @@ def simulate_workflow_random(
                     idx += 1
             else: # Should be caught by "not current_patient.needs_studies()"
                 idx += 1
+        if step_callback is not None:
+            _report_step(step_callback, time_step, lines, active_sessions, waiting_queues, completed_patients)
                 
     if completed_patients:
         total_wait_time_for_completed = sum(
@@ -387,7 +453,11 @@ def simulate_workflow_random(
     return {
         "completed_patients": completed_patients,
         "waiting_patients_final_state_objects": [
-            wp["patient"] for wp in waiting_patients
+            patient
+            for _, patient, _ in sorted(
+                (entry for queue in waiting_queues.values() for entry in queue),
+                key=lambda entry: entry[0],
+            )
         ],
         "active_sessions_final_state_patients": [
             s["patient"] for sessions in active_sessions.values() for s in sessions
@@ -0,0 +1,246 @@
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from typing import Callable, Dict, Hashable, Iterable, List, Tuple
+import numpy as np
+import pandas as pd
+
+from SimFinal import Study
+from admission_schedule import AdmissionSchedule, as_schedule
+from cohorts import Cohorts
+from event_engine import simulate_workflow_events, simulate_workflow_random_events
+from router import get_fastest_study_dp
+
+STATISTICS = ("mean_wait", "p95_wait")
+
+
+def _incomplete_beta(x: float, a: float, b: float) -> float:
+    """Regularized incomplete beta function I_x(a, b), by its continued fraction."""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    if x > (a + 1) / (a + b + 2):
+        # The continued fraction converges fast only below the mean
+        return 1.0 - _incomplete_beta(1.0 - x, b, a)
+    front = math.exp(
+        math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log1p(-x)
+    ) / a
+    # Modified Lentz's method
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    fraction = d
+    for m in range(1, 300):
+        for numerator in (
+            m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+            -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1)),
+        ):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            fraction *= c * d
+        if abs(c * d - 1.0) < 1e-15:
+            break
+    return front * fraction
+
+
+@lru_cache(maxsize=None)
+def t_quantile(confidence: float, dof: int) -> float:
+    """
+    Two-sided Student t critical value: P(|T| <= t) = confidence with dof
+    degrees of freedom (12.706 for 95% and dof=1).
+    """
+    if dof <= 0:
+        return math.inf
+    # P(|T| > t) = I_x(dof / 2, 1 / 2) with x = dof / (dof + t^2), increasing in x
+    alpha = 1.0 - confidence
+    low, high = 0.0, 1.0
+    for _ in range(200):
+        x = (low + high) / 2
+        if _incomplete_beta(x, dof / 2, 0.5) < alpha:
+            low = x
+        else:
+            high = x
+        if high - low < 1e-16:
+            break
+    x = (low + high) / 2
+    return math.sqrt(dof * (1.0 - x) / x)
+
+
+def half_width(values, confidence: float = 0.95) -> float:
+    """Half-width of the t confidence interval on the mean of values."""
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if len(values) < 2:
+        return math.inf
+    return t_quantile(confidence, len(values) - 1) * values.std(ddof=1) / math.sqrt(len(values))
+
+
+def _run_one(job: Tuple) -> Dict:
+    run, scenario, replication, entropy = job
+    # A fresh SeedSequence per job: replication r gets the same streams in every scenario
+    waits = np.asarray(run(scenario, np.random.SeedSequence(entropy, spawn_key=(replication,))))
+    return {
+        "scenario": scenario,
+        "replication": replication,
+        "patients": len(waits),
+        "mean_wait": waits.mean() if len(waits) else np.nan,
+        "p95_wait": np.percentile(waits, 95) if len(waits) else np.nan,
+    }
+
+
+def sequential_replications(
+    run: Callable,
+    scenarios: Iterable[Hashable],
+    seed: int = 0,
+    batch_size: int = 10,
+    min_replications: int = 10,
+    max_replications: int = 100,
+    rel_precision: float = 0.05,
+    abs_precision: float = None,
+    confidence: float = 0.95,
+    baseline: Hashable = None,
+    max_workers: int = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Runs replications in batches until every scenario is precise enough.
+
+    run(scenario, seed_sequence) simulates one replication and returns the
+    waits of its patients. Replication r of every scenario gets the same
+    seed_sequence, so scenarios are compared on common random numbers.
+
+    A scenario stops once the confidence interval on its mean wait and on
+    its p95 wait (both taken per replication) has a half-width of at most
+    rel_precision times the estimate or abs_precision minutes, whichever is
+    larger; abs_precision keeps near-zero waits from running forever.
+    The first batch has min_replications runs and no scenario gets more than
+    max_replications. run must be picklable unless max_workers=1.
+
+    Returns (runs, summary): one row per replication, and one row per
+    scenario with the estimates, their half-widths and whether it converged.
+    With a baseline scenario the summary also has the paired difference of
+    the mean wait against it, over the replications both ran.
+    """
+    scenarios = list(scenarios)
+    entropy = np.random.SeedSequence(seed).entropy
+    rows: List[Dict] = []
+    by_scenario: Dict[Hashable, List[Dict]] = {scenario: [] for scenario in scenarios}
+
+    def precise(scenario) -> bool:
+        for statistic in STATISTICS:
+            values = [row[statistic] for row in by_scenario[scenario]]
+            target = max(rel_precision * abs(np.nanmean(values)), abs_precision or 0.0)
+            if not half_width(values, confidence) <= target:
+                return False
+        return True
+
+    active = list(scenarios)
+    done = 0
+    executor = ProcessPoolExecutor(max_workers=max_workers) if max_workers != 1 else None
+    try:
+        while active and done < max_replications:
+            size = min_replications if done == 0 else batch_size
+            batch = range(done, min(done + size, max_replications))
+            jobs = [(run, scenario, r, entropy) for scenario in active for r in batch]
+            results = executor.map(_run_one, jobs) if executor else map(_run_one, jobs)
+            for row in results:
+                rows.append(row)
+                by_scenario[row["scenario"]].append(row)
+            done = batch.stop
+            active = [scenario for scenario in active if not precise(scenario)]
+    finally:
+        if executor:
+            executor.shutdown()
+
+    runs = pd.DataFrame(rows, columns=["scenario", "replication", "patients", *STATISTICS])
+    summary = []
+    for scenario in scenarios:
+        scenario_rows = by_scenario[scenario]
+        entry = {"scenario": scenario, "replications": len(scenario_rows)}
+        for statistic in STATISTICS:
+            values = [row[statistic] for row in scenario_rows]
+            entry[statistic] = np.nanmean(values)
+            entry[f"{statistic}_half_width"] = half_width(values, confidence)
+        entry["converged"] = precise(scenario)
+        if baseline is not None:
+            base = {row["replication"]: row["mean_wait"] for row in by_scenario[baseline]}
+            differences = [
+                row["mean_wait"] - base[row["replication"]]
+                for row in scenario_rows
+                if row["replication"] in base
+            ]
+            entry["mean_wait_vs_baseline"] = np.nanmean(differences) if differences else np.nan
+            entry["mean_wait_vs_baseline_half_width"] = half_width(differences, confidence)
+        summary.append(entry)
+    return runs, pd.DataFrame(summary)
+
+
+def _workflow_run(
+    scenario: Tuple[str, int],
+    seed_sequence: np.random.SeedSequence,
+    study_defs: Dict[str, Study],
+    admission_schedule: AdmissionSchedule,
+    n_patients: int,
+    min_studies: int,
+    max_studies: int,
+    time_period: int,
+) -> np.ndarray:
+    strategy, lookahead = scenario
+    cohort_seed, admission_seed, engine_seed = seed_sequence.spawn(3)
+    patients = Cohorts.draw(
+        np.random.default_rng(cohort_seed), study_defs, n_patients, 1, min_studies, max_studies
+    ).patients(0)
+    admissions = admission_schedule.predraw(np.random.default_rng(admission_seed))
+    random.seed(int(engine_seed.generate_state(1)[0]))
+
+    if strategy == "lookahead":
+        final_state = simulate_workflow_events(
+            get_fastest_study_dp, patients, study_defs, time_period, admissions,
+            show_steps=False, lookahead=lookahead,
+        )
+    elif strategy == "random":
+        final_state = simulate_workflow_random_events(
+            patients, study_defs, time_period, admissions, show_steps=False
+        )
+    else:
+        raise ValueError(f"Unknown strategy {strategy!r}, expected 'lookahead' or 'random'")
+    return np.array([p.total_wait_time for p in final_state["completed_patients"]])
+
+
+def adaptive_workflow_replications(
+    study_defs: Dict[str, Study],
+    admission_schedule: Dict[tuple, float] | AdmissionSchedule,
+    lookaheads: Iterable[int] = range(7),
+    include_random: bool = True,
+    n_patients: int = 950,
+    min_studies: int = 1,
+    max_studies: int = 7,
+    time_period: int = 1440,
+    **options,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    sequential_replications over the lookahead values (scenario
+    ("lookahead", l)) and the random baseline (("random", None)).
+
+    Every scenario sees the same cohort and the same pre-drawn admissions in
+    replication r; waits are those of completed patients, as in
+    average_wait_time_completed. The random strategy is the default
+    baseline. Other keyword options go to sequential_replications.
+    """
+    scenarios = [("lookahead", lookahead) for lookahead in lookaheads]
+    if include_random:
+        scenarios.append(("random", None))
+        options.setdefault("baseline", ("random", None))
+    run = partial(
+        _workflow_run,
+        study_defs=study_defs,
+        admission_schedule=as_schedule(admission_schedule, time_period),
+        n_patients=n_patients,
+        min_studies=min_studies,
+        max_studies=max_studies,
+        time_period=time_period,
+    )
+    return sequential_replications(run, scenarios, **options)
@@ -0,0 +1,148 @@
+import copy
+from typing import Dict, Mapping, Sequence
+import numpy as np
+
+
+class AdmissionSchedule:
+    """
+    An admission schedule compiled once into a dense per-minute rate array.
+
+    schedule maps (start, end) minute ranges to the mean number of patients
+    admitted per minute, like the dicts passed to simulate_workflow. Minutes
+    not covered get default_rate. Overlapping ranges raise ValueError unless
+    allow_overlaps is set, in which case the first matching range wins as in
+    get_current_mean_admission_rate; allow_gaps=False also rejects uncovered
+    minutes.
+
+    A schedule can also carry fixed admission counts (see predraw and
+    from_arrivals); the simulators then admit exactly those counts instead of
+    drawing them.
+    """
+
+    def __init__(
+        self,
+        schedule: Dict[tuple, float],
+        time_period: int,
+        default_rate: float = 1.0,
+        allow_overlaps: bool = False,
+        allow_gaps: bool = True,
+    ):
+        self.time_period = time_period
+        self.default_rate = default_rate
+        self.rates = np.full(time_period, float(default_rate))
+        self.counts = None
+
+        covered = np.zeros(time_period, dtype=bool)
+        entries = list(schedule.items())
+        for (start, end), rate in entries:
+            if end <= start:
+                raise ValueError(f"Empty admission range ({start}, {end})")
+            if rate < 0:
+                raise ValueError(f"Negative admission rate {rate} for ({start}, {end})")
+            lo, hi = max(start, 0), min(end, time_period)
+            if not allow_overlaps and covered[lo:hi].any():
+                raise ValueError(f"Admission range ({start}, {end}) overlaps another range")
+            covered[lo:hi] = True
+        if not allow_gaps and not covered.all():
+            first_gap = int(np.flatnonzero(~covered)[0])
+            raise ValueError(f"No admission rate for minute {first_gap}")
+
+        # Reversed so that, with overlaps, the first matching range wins
+        for (start, end), rate in reversed(entries):
+            self.rates[max(start, 0):min(end, time_period)] = rate
+
+    @classmethod
+    def from_hourly(
+        cls,
+        hourly_arrivals,
+        time_period: int = 1440,
+        first_hour: int = 0,
+        default_rate: float = 0.0,
+    ) -> "AdmissionSchedule":
+        """
+        Schedule from mean arrivals per hour of the day.
+
+        hourly_arrivals is a mapping hour -> arrivals (e.g. the
+        llegadas_por_hora_promedio Series computed in simulaciones) or a
+        sequence indexed by hour. Minute 0 of the simulation is the start of
+        first_hour.
+        """
+        if isinstance(hourly_arrivals, Mapping) or hasattr(hourly_arrivals, "items"):
+            by_hour = dict(hourly_arrivals.items())
+        else:
+            by_hour = dict(enumerate(hourly_arrivals))
+
+        schedule = {}
+        for hour, arrivals in by_hour.items():
+            start = (int(hour) - first_hour) * 60
+            if start + 60 <= 0 or start >= time_period:
+                continue
+            schedule[(start, start + 60)] = float(arrivals) / 60
+        return cls(schedule, time_period, default_rate)
+
+    @classmethod
+    def from_arrivals(
+        cls, arrival_times: Sequence, day_start, time_period: int = 1440
+    ) -> "AdmissionSchedule":
+        """
+        Fixed admissions from concrete arrival timestamps, such as the
+        FechaHoraSimulada column produced by simulacion_pacientes.
+        """
+        minutes = (
+            np.asarray(arrival_times, dtype="datetime64[ns]")
+            - np.datetime64(day_start, "ns")
+        ) // np.timedelta64(1, "m")
+        minutes = minutes[(minutes >= 0) & (minutes < time_period)].astype(np.int64)
+        counts = np.bincount(minutes, minlength=time_period)
+        compiled = cls({}, time_period, 0.0)
+        compiled.rates = counts.astype(float)
+        compiled.counts = counts
+        return compiled
+
+    def rate(self, time_step: int) -> float:
+        if 0 <= time_step < self.time_period:
+            return float(self.rates[time_step])
+        return float(self.default_rate)
+
+    def draw_counts(self, rng: np.random.Generator = None) -> np.ndarray:
+        """
+        Admission counts for every minute of the day in one Poisson call.
+
+        Without rng the global numpy stream is used, in the same order as the
+        per-step draws of simulate_workflow.
+        """
+        if self.counts is not None:
+            return self.counts.copy()
+        counts = np.zeros(self.time_period, dtype=np.int64)
+        positive = self.rates > 0
+        if rng is None:
+            counts[positive] = np.random.poisson(lam=self.rates[positive])
+        else:
+            counts[positive] = rng.poisson(lam=self.rates[positive])
+        return counts
+
+    def predraw(self, rng: np.random.Generator = None) -> "AdmissionSchedule":
+        """Copy of this schedule with the day's admissions drawn and fixed."""
+        fixed = copy.copy(self)
+        fixed.counts = self.draw_counts(rng)
+        return fixed
+
+    def admissions_at(self, time_step: int) -> int:
+        """Number of patients to admit at one time step, as simulate_workflow does."""
+        if self.counts is not None:
+            return int(self.counts[time_step]) if time_step < self.time_period else 0
+        mean_rate_this_step = self.rate(time_step)
+        if mean_rate_this_step > 0:
+            return np.random.poisson(lam=mean_rate_this_step)
+        return 0
+
+
+def as_schedule(
+    admission_schedule, time_period: int, default_rate: float = 1.0
+) -> AdmissionSchedule:
+    """Compiles a schedule dict with the lookup rules of the simulators; compiled ones pass through."""
+    if isinstance(admission_schedule, AdmissionSchedule):
+        return admission_schedule
+    return AdmissionSchedule(
+        admission_schedule, time_period, default_rate, allow_overlaps=True
+    )
@@ -0,0 +1,186 @@
+from typing import Dict
+import numpy as np
+
+from SimFinal import Study
+from admission_schedule import AdmissionSchedule, as_schedule
+
+
+def _rank_within_groups(sorted_keys: np.ndarray) -> np.ndarray:
+    """0, 1, 2... restarting at every new value of an already sorted key array."""
+    _, starts, counts = np.unique(sorted_keys, return_index=True, return_counts=True)
+    return np.arange(len(sorted_keys)) - np.repeat(starts, counts)
+
+
+def simulate_workflow_random_batched(
+    required: np.ndarray,
+    study_defs: Dict[str, Study],
+    time_period: int,
+    replications: int = None,
+    admission_schedule: Dict[tuple, float] | AdmissionSchedule = None,
+    default_initial_admission_rate: float = 1.0,
+    rng: np.random.Generator = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Runs many independent replications of simulate_workflow_random in lockstep.
+
+    required holds study bitmasks (bit i = i-th entry of study_defs), shaped
+    (replications, patients); a 1-D cohort is repeated `replications` times.
+    Every minute goes through the same four phases as simulate_workflow_random,
+    on (replications, studies) line counters and (replications, locales)
+    session slots. Each line is a FIFO of ticket numbers, so a step only
+    touches the patients that finish, start, or join a line.
+
+    Only the random strategy can be batched this way: it needs no per-patient
+    lookahead. Each study needs at least one locale. Without rng the generator
+    is seeded from np.random, so np.random.seed keeps runs reproducible.
+
+    Returns per-replication arrays: average_wait_time_completed, num_completed,
+    total_wait_time (replications, patients) and lines (replications, studies).
+    """
+    study_names = list(study_defs.keys())
+    n_studies = len(study_names)
+    locales = np.array([study_defs[name].locales for name in study_names], dtype=np.int64)
+    if (locales < 1).any():
+        raise ValueError("Every study needs at least one locale in batched mode")
+    # A session started at step t ends at t + ceil(time) (at least one step later)
+    session_steps = np.maximum(
+        np.ceil([study_defs[name].time for name in study_names]), 1
+    )
+    if rng is None:
+        rng = np.random.default_rng(np.random.randint(2**32, dtype=np.uint64))
+
+    required = np.asarray(required, dtype=np.int64)
+    if required.ndim == 1:
+        required = np.tile(required, (replications or 1, 1))
+    n_reps, n_patients = required.shape
+    reps = np.arange(n_reps)
+    study_bits = np.int64(1) << np.arange(n_studies, dtype=np.int64)
+
+    # Per-patient state
+    remaining = required.copy()
+    done = np.zeros((n_reps, n_patients), dtype=bool)
+    entered_at = np.zeros((n_reps, n_patients))
+    total_wait = np.zeros((n_reps, n_patients))
+
+    # Per-line state. A patient joins each line at most once, so the line's
+    # tickets (0, 1, 2...) index line_patient directly.
+    line_patient = np.zeros((n_reps, n_studies, n_patients), dtype=np.int32)
+    issued = np.zeros((n_reps, n_studies), dtype=np.int64)
+    served = np.zeros((n_reps, n_studies), dtype=np.int64)
+    free_locales = np.tile(locales, (n_reps, 1))
+
+    # One slot per locale, grouped by study
+    slot_study = np.repeat(np.arange(n_studies), locales)
+    slot_patient = np.zeros((n_reps, len(slot_study)), dtype=np.int64)
+    slot_finish = np.full((n_reps, len(slot_study)), np.inf)
+
+    # with_studies_before[r, i]: patients with studies in front of patient i
+    with_studies_before = np.zeros((n_reps, n_patients + 1), dtype=np.int64)
+    np.cumsum(remaining != 0, axis=1, out=with_studies_before[:, 1:])
+    next_arrival = np.zeros(n_reps, dtype=np.int64)
+    compiled_schedule = (
+        as_schedule(admission_schedule, time_period, default_initial_admission_rate)
+        if admission_schedule
+        else None
+    )
+
+    def enter_lines(r_idx: np.ndarray, p_idx: np.ndarray, time_step: int):
+        # Random choice among the remaining studies of each patient
+        has_bit = (remaining[r_idx, p_idx][:, None] & study_bits) != 0
+        keys = np.where(has_bit, rng.random((len(r_idx), n_studies)), -1.0)
+        s_idx = keys.argmax(axis=1)
+
+        # Tickets in entry order within each (replication, study) line
+        line = r_idx * n_studies + s_idx
+        order = np.argsort(line, kind="stable")
+        r_idx, p_idx, s_idx, line = r_idx[order], p_idx[order], s_idx[order], line[order]
+        tickets = issued.ravel()[line] + _rank_within_groups(line)
+        line_patient[r_idx, s_idx, tickets] = p_idx
+        np.add.at(issued.ravel(), line, 1)
+        entered_at[r_idx, p_idx] = time_step
+
+    for time_step in range(time_period):
+        # 1. Process active sessions
+        r_idx, l_idx = np.nonzero(slot_finish <= time_step)
+        rerouted = None
+        if len(r_idx):
+            p_idx = slot_patient[r_idx, l_idx]
+            s_idx = slot_study[l_idx]
+            slot_finish[r_idx, l_idx] = np.inf
+            np.add.at(free_locales, (r_idx, s_idx), 1)
+            remaining[r_idx, p_idx] &= ~study_bits[s_idx]
+            finished_all = remaining[r_idx, p_idx] == 0
+            done[r_idx[finished_all], p_idx[finished_all]] = True
+            rerouted = (r_idx[~finished_all], p_idx[~finished_all])
+
+        # 2. Assign waiting patients to free locales
+        to_call = np.minimum(free_locales, issued - served)
+        r_line, s_line = np.nonzero(to_call)
+        if len(r_line):
+            counts = to_call[r_line, s_line]
+            r_idx = np.repeat(r_line, counts)
+            s_idx = np.repeat(s_line, counts)
+            nth = _rank_within_groups(np.repeat(np.arange(len(counts)), counts))
+            p_idx = line_patient[r_idx, s_idx, served[r_idx, s_idx] + nth]
+            total_wait[r_idx, p_idx] += time_step - entered_at[r_idx, p_idx]
+            served += to_call
+            free_locales -= to_call
+
+            # nth caller of a line takes the nth free slot of that study
+            r_free, l_free = np.nonzero(slot_finish == np.inf)
+            free_key = r_free * n_studies + slot_study[l_free]
+            slot = l_free[
+                np.searchsorted(free_key, r_idx * n_studies + s_idx) + nth
+            ]
+            slot_patient[r_idx, slot] = p_idx
+            slot_finish[r_idx, slot] = time_step + session_steps[s_idx]
+
+        # 3. Re-assign patients who just finished a study (random choice)
+        if rerouted is not None and len(rerouted[0]):
+            enter_lines(rerouted[0], rerouted[1], time_step)
+
+        # 4. Admit new patients
+        if compiled_schedule is not None and compiled_schedule.counts is not None:
+            # Fixed admissions are shared by every replication
+            num_to_admit = np.full(n_reps, compiled_schedule.admissions_at(time_step))
+        elif compiled_schedule is not None:
+            mean_rate_this_step = compiled_schedule.rate(time_step)
+            if mean_rate_this_step > 0:
+                num_to_admit = rng.poisson(mean_rate_this_step, size=n_reps)
+            else:
+                num_to_admit = np.zeros(n_reps, dtype=np.int64)
+        else:
+            num_to_admit = np.full(n_reps, int(default_initial_admission_rate))
+
+        if num_to_admit.any() and next_arrival.min() < n_patients:
+            # Patients without studies are passed over while admission budget remains
+            target = with_studies_before[reps, next_arrival] + num_to_admit
+            lowest = next_arrival.min()
+            new_next_arrival = lowest + (
+                with_studies_before[:, lowest:n_patients] < target[:, None]
+            ).sum(axis=1)
+            columns = np.arange(lowest, new_next_arrival.max())
+            r_idx, c_idx = np.nonzero(
+                (columns >= next_arrival[:, None]) & (columns < new_next_arrival[:, None])
+            )
+            p_idx = columns[c_idx]
+            no_studies = remaining[r_idx, p_idx] == 0
+            done[r_idx[no_studies], p_idx[no_studies]] = True
+            if (~no_studies).any():
+                enter_lines(r_idx[~no_studies], p_idx[~no_studies], time_step)
+            next_arrival = new_next_arrival
+
+    num_completed = done.sum(axis=1)
+    wait_completed = np.where(done, total_wait, 0.0).sum(axis=1)
+    average_wait_time_completed = np.divide(
+        wait_completed,
+        num_completed,
+        out=np.zeros(n_reps),
+        where=num_completed > 0,
+    )
+    return {
+        "average_wait_time_completed": average_wait_time_completed,
+        "num_completed": num_completed,
+        "total_wait_time": total_wait,
+        "lines": issued - served,
+    }
@@ -0,0 +1,168 @@
+import math
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+
+from SimFinal import Patient, Study
+from admission_schedule import AdmissionSchedule, as_schedule
+from event_engine import simulate_workflow_events
+from replications import generate_patients
+from router import get_fastest_study_dp
+
+
+def _scenarios(
+    study_defs: Dict[str, Study],
+    admission_schedule: Dict[tuple, float] | AdmissionSchedule,
+    replications: int,
+    n_patients: int,
+    min_studies: int,
+    max_studies: int,
+    time_period: int,
+    seed: int,
+) -> List[Tuple[List[List[str]], AdmissionSchedule]]:
+    """Cohorts (as study names) and pre-drawn admissions shared by every candidate."""
+    compiled_schedule = as_schedule(admission_schedule, time_period)
+    scenarios = []
+    for replication_seed in np.random.SeedSequence(seed).spawn(replications):
+        cohort_seed, admission_seed = replication_seed.spawn(2)
+        patients = generate_patients(
+            np.random.default_rng(cohort_seed), n_patients, study_defs, min_studies, max_studies
+        )
+        admissions = compiled_schedule.predraw(np.random.default_rng(admission_seed))
+        scenarios.append(([[s.name for s in p.studies_remaining] for p in patients], admissions))
+    return scenarios
+
+
+def _evaluate(
+    locales: Dict[str, int],
+    study_defs: Dict[str, Study],
+    scenarios,
+    target_wait: float,
+    allowed: int,
+    lookahead: int,
+    time_period: int,
+):
+    """
+    Runs the scenarios with the given locales until done or until more than
+    `allowed` patients missed the target. Returns (feasible, misses,
+    replications run, per-study congestion).
+    """
+    candidate = {name: Study(name, locales[name], s.time) for name, s in study_defs.items()}
+    misses = 0
+    runs = 0
+    congestion = dict.fromkeys(candidate, 0.0)
+    for cohort, admissions in scenarios:
+        patients = [
+            Patient(studies=[candidate[name] for name in names], id_num=i)
+            for i, names in enumerate(cohort)
+        ]
+        final_state = simulate_workflow_events(
+            get_fastest_study_dp, patients, candidate, time_period, admissions,
+            show_steps=False, lookahead=lookahead, profile=True,
+        )
+        # Admitted patients miss the target if they did not finish or waited too long
+        admitted = len(patients) - len(final_state["still_in_arrival_queue"])
+        on_target = sum(
+            p.total_wait_time <= target_wait for p in final_state["completed_patients"]
+        )
+        misses += admitted - on_target
+        runs += 1
+        # Longest line times study time per locale: worst wait seen at each study
+        for name, peak in final_state["profile"]["peak_lines"].items():
+            congestion[name] += peak * candidate[name].time / candidate[name].locales
+        if misses > allowed:
+            break
+    return misses <= allowed, misses, runs, congestion
+
+
+def minimal_locales(
+    study_defs: Dict[str, Study],
+    admission_schedule: Dict[tuple, float] | AdmissionSchedule,
+    percentile: float = 0.95,
+    target_wait: float = 20.0,
+    replications: int = 10,
+    n_patients: int = 950,
+    min_studies: int = 1,
+    max_studies: int = 7,
+    lookahead: int = 1,
+    time_period: int = 1440,
+    seed: int = 0,
+    max_locales: int = 50,
+) -> Tuple[Dict[str, Study] | None, pd.DataFrame]:
+    """
+    Locales per study such that the `percentile` of the total wait of
+    admitted patients is at most target_wait (patients who do not finish the
+    day count as missing it). This is a greedy heuristic, not an exhaustive
+    search: the result meets the target, but a configuration with fewer
+    locales in total may still exist.
+
+    Every candidate is run on the same cohorts and the same pre-drawn
+    admissions (AdmissionSchedule.predraw), so differences come from the
+    locales alone. A candidate stops as soon as it has more misses than the
+    target allows over all replications.
+
+    Starts from the workload lower bound of each study and adds one locale at
+    a time to the most congested study until the target is met, then tries to
+    take back, one study at a time, locales that turned out not to be
+    needed. Returns new study_defs (None if max_locales per study is not
+    enough) and one row per candidate evaluated.
+    """
+    scenarios = _scenarios(
+        study_defs, admission_schedule, replications, n_patients,
+        min_studies, max_studies, time_period, seed,
+    )
+    admitted = sum(
+        min(len(cohort), int(admissions.draw_counts()[:time_period].sum()))
+        for cohort, admissions in scenarios
+    )
+    allowed = math.floor((1 - percentile) * admitted + 1e-9)
+
+    # No study can do more than locales * time_period minutes of work in a day
+    demand = dict.fromkeys(study_defs, 0)
+    for cohort, _ in scenarios:
+        for names in cohort:
+            for name in names:
+                demand[name] += 1
+    locales = {
+        name: max(1, math.ceil(demand[name] / replications * s.time / time_period))
+        for name, s in study_defs.items()
+    }
+    lower_bound = dict(locales)
+
+    rows = []
+
+    def evaluate(candidate):
+        feasible, misses, runs, congestion = _evaluate(
+            candidate, study_defs, scenarios, target_wait, allowed, lookahead, time_period
+        )
+        rows.append({
+            **{f"locales_{name}": n for name, n in candidate.items()},
+            "total_locales": sum(candidate.values()),
+            "feasible": feasible,
+            "misses": misses,
+            "replications_run": runs,
+            "stopped_early": runs < len(scenarios),
+        })
+        return feasible, congestion
+
+    feasible, congestion = evaluate(locales)
+    while not feasible:
+        can_grow = [name for name in locales if locales[name] < max_locales]
+        if not can_grow:
+            return None, pd.DataFrame(rows)
+        bottleneck = max(can_grow, key=lambda name: congestion[name])
+        locales[bottleneck] += 1
+        feasible, congestion = evaluate(locales)
+
+    # Greedy additions can overshoot; drop locales that the target does not need
+    for name in sorted(locales, key=lambda name: congestion[name]):
+        while locales[name] > lower_bound[name]:
+            candidate = {**locales, name: locales[name] - 1}
+            if not evaluate(candidate)[0]:
+                break
+            locales = candidate
+
+    return (
+        {name: Study(name, locales[name], s.time) for name, s in study_defs.items()},
+        pd.DataFrame(rows),
+    )
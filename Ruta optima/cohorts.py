@@ -0,0 +1,101 @@
+from typing import List, Dict
+import numpy as np
+
+from SimFinal import Patient, Study
+from patient_arrays import PatientArrays
+
+
+def draw_study_counts(
+    rng: np.random.Generator, size, min_studies: int, max_studies: int
+) -> np.ndarray:
+    """
+    Number of studies per patient, as in generate_patients of FinalSimulation.ipynb:
+    a unit-scale normal centred on the middle of [min_studies, max_studies],
+    truncated to it, rounded. All draws come from a few batched normal calls.
+    """
+    n = int(np.prod(size))
+    if min_studies == max_studies:
+        # A zero-width interval would never accept a draw
+        return np.full(size, min_studies, dtype=np.int64)
+
+    mean = (min_studies + max_studies) / 2
+    draws = np.empty(0)
+    while len(draws) < n:
+        batch = rng.normal(mean, 1.0, size=n)
+        draws = np.concatenate(
+            [draws, batch[(batch >= min_studies) & (batch <= max_studies)]]
+        )
+    counts = np.clip(np.round(draws[:n]).astype(np.int64), min_studies, max_studies)
+    return counts.reshape(size)
+
+
+class Cohorts:
+    """
+    Study assignments for one or many replications of a cohort, drawn at once.
+
+    order[r, i] is a random permutation of the study indices (study_defs
+    order) for patient i of replication r, and the patient needs its first
+    counts[r, i] entries, in that order. One argsort of a (replications,
+    patients, studies) block of uniforms gives every permutation, the same as
+    a random.sample per patient.
+
+    Patients built from a cohort share the Study objects of study_defs.
+    """
+
+    def __init__(self, study_defs: Dict[str, Study], order: np.ndarray, counts: np.ndarray):
+        self.study_defs = study_defs
+        self.studies = list(study_defs.values())
+        self.order = np.asarray(order)
+        self.counts = np.asarray(counts)
+
+    @classmethod
+    def draw(
+        cls,
+        rng: np.random.Generator,
+        study_defs: Dict[str, Study],
+        n_patients: int,
+        replications: int = 1,
+        min_studies: int = 1,
+        max_studies: int = 7,
+    ) -> "Cohorts":
+        n_studies = len(study_defs)
+        if not 0 <= min_studies <= max_studies <= n_studies:
+            raise ValueError(
+                f"Need 0 <= min_studies <= max_studies <= {n_studies}, "
+                f"got {min_studies} and {max_studies}"
+            )
+        counts = draw_study_counts(rng, (replications, n_patients), min_studies, max_studies)
+        order = np.argsort(rng.random((replications, n_patients, n_studies)), axis=-1)
+        return cls(study_defs, order.astype(np.int8 if n_studies < 128 else np.int64), counts)
+
+    def __len__(self):
+        return len(self.counts)
+
+    @property
+    def n_patients(self) -> int:
+        return self.counts.shape[1]
+
+    def required(self) -> np.ndarray:
+        """Boolean (replications, patients, studies) matrix of the studies each patient needs."""
+        rank = np.empty_like(self.order)
+        np.put_along_axis(
+            rank, self.order.astype(np.int64), np.arange(self.order.shape[-1], dtype=rank.dtype), axis=-1
+        )
+        return rank < self.counts[..., None]
+
+    def masks(self) -> np.ndarray:
+        """(replications, patients) study bitmasks, as used by PatientArrays and batched."""
+        bits = np.int64(1) << np.arange(self.order.shape[-1], dtype=np.int64)
+        return (self.required() * bits).sum(axis=-1)
+
+    def patients(self, replication: int = 0) -> List[Patient]:
+        studies = self.studies
+        return [
+            Patient(studies=[studies[j] for j in row[:k]], id_num=i)
+            for i, (row, k) in enumerate(
+                zip(self.order[replication].tolist(), self.counts[replication].tolist())
+            )
+        ]
+
+    def patient_arrays(self, replication: int = 0) -> PatientArrays:
+        return PatientArrays(self.study_defs, self.masks()[replication])
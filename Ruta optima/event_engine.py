@@ -0,0 +1,658 @@
+import copy
+import heapq
+import math
+import random
+import time
+from collections import deque
+from typing import List, Dict, Any, Callable
+import numpy as np
+
+from SimFinal import Patient, Study
+from admission_schedule import AdmissionSchedule, as_schedule
+from workflow_profile import WorkflowProfile
+
+
+# Event kinds. Events that share a timestamp are processed in this order, which
+# mirrors the phases of one time step in simulate_workflow: finished sessions
+# free their locales, waiting patients take free locales, finished patients are
+# re-routed and, last, new patients are admitted.
+FINISH = 0
+LOCALE_FREE = 1
+ARRIVAL = 2
+
+
+def draw_admission_counts(
+    time_period: int,
+    admission_schedule: Dict[tuple, float] | AdmissionSchedule = None,
+    default_initial_admission_rate: float = 1.0,
+) -> np.ndarray:
+    """
+    Number of patients to admit at every time step of the day.
+
+    Draws all Poisson counts in one call. The global numpy stream is consumed
+    in the same order as the per-step draws of simulate_workflow, so both
+    engines admit the same patients under the same seed.
+    """
+    if not admission_schedule:
+        return np.full(time_period, int(default_initial_admission_rate), dtype=np.int64)
+    compiled_schedule = as_schedule(
+        admission_schedule, time_period, default_initial_admission_rate
+    )
+    counts = np.zeros(time_period, dtype=np.int64)
+    drawn = compiled_schedule.draw_counts()[:time_period]
+    counts[:len(drawn)] = drawn
+    # Past the end of a shorter schedule, rate() gives its default rate (fixed
+    # counts admit nobody), as admissions_at does in simulate_workflow
+    if len(drawn) < time_period and compiled_schedule.counts is None and compiled_schedule.default_rate > 0:
+        counts[len(drawn):] = np.random.poisson(
+            lam=compiled_schedule.default_rate, size=time_period - len(drawn)
+        )
+    return counts
+
+
+def _copy_patient(patient: Patient, studies_by_name: Dict[str, Study] = None) -> Patient:
+    # Study objects are shared; a fork with other locales points them at its own
+    copied = copy.copy(patient)
+    if studies_by_name is None:
+        copied.studies_remaining = patient.studies_remaining[:]
+        copied.completed_studies = patient.completed_studies[:]
+    else:
+        copied.studies_remaining = [studies_by_name.get(s.name, s) for s in patient.studies_remaining]
+        copied.completed_studies = [studies_by_name.get(s.name, s) for s in patient.completed_studies]
+    return copied
+
+
+class EventRun:
+    """
+    State of one discrete-event run of the workflow.
+
+    run(until) processes every event before `until` and can be called again
+    to continue; checkpoint() snapshots the state between two calls so it
+    can be forked into several continuations (see Checkpoint).
+
+    make_chooser(study_defs) returns the routing rule, choose_study(patient,
+    lines) -> Study | None, for a set of study definitions.
+
+    The calendar loop only touches patients through _admit, _needs_studies,
+    _join_line, _leave_line and _finish_study, so a subclass can keep patient
+    state elsewhere (see PatientArraysRun in patient_arrays.py). Such a
+    subclass keeps checkpoints working through _chooser, _fork_patient,
+    _save_patients and _restore_patients.
+    """
+
+    def __init__(
+        self,
+        make_chooser: Callable[[Dict[str, Study]], Callable],
+        initial_patient_list: List[Patient],
+        study_defs: Dict[str, Study],
+        time_period: int,
+        admission_counts: np.ndarray,
+        dispatch_delay: float,
+        show_steps: bool,
+        workflow_profile: WorkflowProfile = None,
+        step_callback: Callable = None,
+        event_log: Callable = None,
+    ):
+        self.make_chooser = make_chooser
+        self.choose_study = self._chooser(study_defs)
+        self.study_defs = study_defs
+        self.time_period = time_period
+        self.dispatch_delay = dispatch_delay
+        self.show_steps = show_steps
+        self.workflow_profile = workflow_profile
+        self.step_callback = step_callback
+        self.event_log = event_log
+
+        self.study_index = {name: i for i, name in enumerate(study_defs.keys())}
+        study_names = list(study_defs.keys())
+        self.patient_arrival_queue = deque(initial_patient_list)
+        # One FIFO queue per study: (time entered, entry order, patient, study object)
+        self.queues: List[deque] = [deque() for _ in study_names]
+        # Active sessions per study keyed by start order, so a finish removes in O(1)
+        self.active: List[Dict[int, Patient]] = [dict() for _ in study_names]
+        self.free_locales = [study_defs[name].locales for name in study_names]
+        self.lines: Dict[str, int] = {name: 0 for name in study_names}
+        self.completed_patients: List[Patient] = []
+        self.calendar: List[tuple] = []
+        self.counter = 0  # Tie-breaker that keeps same-time events in creation order
+        self.next_minute = 0
+        self.time = 0.0
+        # Set once the patients still waiting to be admitted are shared with a
+        # checkpoint: from then on they are copied when admitted
+        self.copy_on_admit = False
+        self.studies_by_name: Dict[str, Study] = None
+        self.rng_state = None
+
+        for time_step in np.flatnonzero(admission_counts[:time_period]):
+            self.counter += 1
+            heapq.heappush(
+                self.calendar,
+                (float(time_step), ARRIVAL, 0, self.counter, int(admission_counts[time_step]), None),
+            )
+
+    # Patient state
+
+    def _chooser(self, study_defs: Dict[str, Study]) -> Callable:
+        return self.make_chooser(study_defs)
+
+    # Copy of a patient in a line or in a study, for a checkpoint or a fork
+    _fork_patient = staticmethod(_copy_patient)
+
+    def _save_patients(self):
+        # Patient objects carry their own progress and are copied with the lines
+        return None
+
+    def _restore_patients(self, state):
+        pass
+
+    def _admit(self, patient: Patient) -> Patient:
+        # A patient with nothing to do is admitted as already done
+        if self.copy_on_admit:
+            patient = _copy_patient(patient, self.studies_by_name)
+        if not patient.needs_studies():
+            patient.time_entered_current_queue = -1.0
+        return patient
+
+    def _needs_studies(self, patient: Patient) -> bool:
+        return patient.needs_studies()
+
+    def _join_line(self, patient: Patient, now: float):
+        patient.time_entered_current_queue = now
+
+    def _leave_line(self, patient: Patient, now: float) -> float | None:
+        # Wait added to the patient's total, None if they were not waiting
+        entered = patient.time_entered_current_queue
+        patient.time_entered_current_queue = -1.0
+        if entered == -1.0:
+            return None
+        patient.total_wait_time += now - entered
+        return now - entered
+
+    def _finish_study(self, patient: Patient, study_obj: Study):
+        patient.complete_study(study_obj)
+
+    # Calendar
+
+    def _enqueue(self, patient: Patient, study_obj: Study, now: float):
+        s_idx = self.study_index[study_obj.name]
+        # Patient is entering a new specific study queue.
+        self._join_line(patient, now)
+        self.counter += 1
+        self.queues[s_idx].append((now, self.counter, patient, study_obj))
+        self.lines[study_obj.name] = self.lines.get(study_obj.name, 0) + 1
+        if self.event_log is not None:
+            self.event_log(now, "queue", patient.id_num, study_obj.name)
+        if self.free_locales[s_idx] > 0 and len(self.queues[s_idx]) == 1:
+            self.counter += 1
+            heapq.heappush(
+                self.calendar, (now + self.dispatch_delay, LOCALE_FREE, s_idx, self.counter, None, None)
+            )
+
+    def _report_until(self, end: float):
+        # The state only changes at events, so every minute before the next
+        # event gets the state left by the events up to that minute.
+        while self.next_minute < end:
+            self.step_callback(
+                self.next_minute,
+                self.lines,
+                [len(sessions) for sessions in self.active],
+                len(self.completed_patients),
+                [self.next_minute - queue[0][0] if queue else math.nan for queue in self.queues],
+            )
+            self.next_minute += 1
+
+    def _dispatch(self, s_idx: int, now: float):
+        queue = self.queues[s_idx]
+        free_locales = self.free_locales
+        show_steps = self.show_steps
+        while queue and free_locales[s_idx] > 0:
+            entered, _, patient, study_obj = queue[0]
+            if entered + self.dispatch_delay > now:
+                # The head of the line cannot be called yet; try again when it can.
+                self.counter += 1
+                heapq.heappush(
+                    self.calendar,
+                    (entered + self.dispatch_delay, LOCALE_FREE, s_idx, self.counter, None, None),
+                )
+                break
+            queue.popleft()
+            wait_duration = self._leave_line(patient, now)
+            if show_steps and wait_duration is not None: print(f"  Patient {patient.id_num} waited {wait_duration} for {study_obj.name}. Total wait: {patient.total_wait_time}")
+            free_locales[s_idx] -= 1
+            self.lines[study_obj.name] -= 1
+            self.counter += 1
+            self.active[s_idx][self.counter] = patient
+            heapq.heappush(
+                self.calendar, (now + study_obj.time, FINISH, s_idx, self.counter, patient, study_obj)
+            )
+            if self.event_log is not None:
+                self.event_log(now, "start", patient.id_num, study_obj.name)
+            if show_steps: print(f"  Patient {patient.id_num} started {study_obj.name}.")
+
+    def run(self, until: float = None) -> Dict[str, Any]:
+        """
+        Processes the events before `until` (default: the end of the day) and
+        returns the result dict of simulate_workflow_events for the state
+        reached.
+        """
+        end = self.time_period if until is None else min(until, self.time_period)
+        if self.rng_state is not None:
+            # A fork continues the random streams from where its checkpoint left them
+            random.setstate(self.rng_state[0])
+            np.random.set_state(self.rng_state[1])
+            self.rng_state = None
+
+        calendar = self.calendar
+        completed_patients = self.completed_patients
+        patient_arrival_queue = self.patient_arrival_queue
+        choose_study = self.choose_study
+        finish_study = self._finish_study
+        needs_studies = self._needs_studies
+        lines = self.lines
+        show_steps = self.show_steps
+        workflow_profile = self.workflow_profile
+        step_callback = self.step_callback
+        event_log = self.event_log
+
+        while calendar and calendar[0][0] < end:
+            now = calendar[0][0]
+            if step_callback is not None:
+                self._report_until(now)
+            if show_steps:
+                print(f"\n--- Time: {now} ---")
+            if workflow_profile:
+                phase_start = time.perf_counter()
+
+            # 1. Study-finish events
+            patients_finished_study_this_step = []
+            to_dispatch = set()
+            while calendar and calendar[0][0] == now and calendar[0][1] == FINISH:
+                _, _, s_idx, seq, patient, study_obj = heapq.heappop(calendar)
+                del self.active[s_idx][seq]
+                self.free_locales[s_idx] += 1
+                to_dispatch.add(s_idx)
+                finish_study(patient, study_obj)
+                if event_log is not None:
+                    event_log(now, "finish", patient.id_num, study_obj.name)
+                if show_steps: print(f"  Patient {patient.id_num} finished {study_obj.name}.")
+                if needs_studies(patient):
+                    patients_finished_study_this_step.append(patient)
+                else:
+                    if show_steps: print(f"  Patient {patient.id_num} completed all studies.")
+                    completed_patients.append(patient)
+            if workflow_profile:
+                phase_start = workflow_profile.end_phase("process_sessions", phase_start)
+
+            # 2. Locale-free events, then hand free locales to the head of each line
+            while calendar and calendar[0][0] == now and calendar[0][1] == LOCALE_FREE:
+                to_dispatch.add(heapq.heappop(calendar)[2])
+            for s_idx in sorted(to_dispatch):
+                self._dispatch(s_idx, now)
+            if workflow_profile:
+                phase_start = workflow_profile.end_phase("assign_waiting", phase_start)
+
+            # 3. Re-route patients who just finished a study
+            for patient in patients_finished_study_this_step:
+                next_study = choose_study(patient, lines)
+                if next_study:
+                    self._enqueue(patient, next_study, now)
+                    if show_steps: print(f"  Patient {patient.id_num} now waiting for {next_study.name}.")
+            if workflow_profile:
+                phase_start = workflow_profile.end_phase("reassign_finished", phase_start)
+
+            # 4. Arrival events
+            while calendar and calendar[0][0] == now and calendar[0][1] == ARRIVAL:
+                num_to_attempt_admission = heapq.heappop(calendar)[4]
+                admitted_count = 0
+                skipped = []
+                while patient_arrival_queue and admitted_count < num_to_attempt_admission:
+                    current_patient = self._admit(patient_arrival_queue.popleft())
+                    if not needs_studies(current_patient):
+                        completed_patients.append(current_patient)
+                        if show_steps: print(f"  Patient {current_patient.id_num} admitted and already completed (no studies).")
+                        continue
+                    fastest_study = choose_study(current_patient, lines)
+                    if fastest_study:
+                        self._enqueue(current_patient, fastest_study, now)
+                        admitted_count += 1
+                        if show_steps: print(f"  Patient {current_patient.id_num} admitted, now waiting for {fastest_study.name}.")
+                    else:
+                        # Cannot find a study for this patient yet, keep their place
+                        skipped.append(current_patient)
+                patient_arrival_queue.extendleft(reversed(skipped))
+            if workflow_profile:
+                workflow_profile.end_phase("admit_arrivals", phase_start)
+                workflow_profile.observe_lines(lines)
+
+        if step_callback is not None:
+            self._report_until(end)
+        else:
+            self.next_minute = max(self.next_minute, math.ceil(end))
+        self.time = max(self.time, end)
+        return self.result()
+
+    def result(self) -> Dict[str, Any]:
+        completed_patients = self.completed_patients
+        if completed_patients:
+            total_wait_time_for_completed = sum(
+                p.total_wait_time for p in completed_patients
+            )
+            average_wait_time_completed = total_wait_time_for_completed / len(
+                completed_patients
+            )
+        else:
+            average_wait_time_completed = 0.0
+
+        still_waiting = sorted(
+            (entry for queue in self.queues for entry in queue), key=lambda entry: entry[1]
+        )
+        final_state = {
+            "completed_patients": completed_patients,
+            "waiting_patients_final_state_objects": [entry[2] for entry in still_waiting],
+            "active_sessions_final_state_patients": [
+                patient for sessions in self.active for patient in sessions.values()
+            ],
+            "lines": self.lines,
+            "still_in_arrival_queue": list(self.patient_arrival_queue),
+            "average_wait_time_completed": average_wait_time_completed,
+        }
+        if self.workflow_profile:
+            final_state["profile"] = self.workflow_profile.to_dict()
+        return final_state
+
+    def checkpoint(self) -> "Checkpoint":
+        """Snapshot of the state reached so far; see Checkpoint."""
+        self.copy_on_admit = True
+        checkpoint = Checkpoint(self)
+        # Continuing this run gives the same day as a fork without changes
+        self.rng_state = checkpoint.rng_state
+        return checkpoint
+
+
+class Checkpoint:
+    """
+    Mid-day state of an EventRun: lines, active sessions, pending events,
+    patient progress and the state of the random streams.
+
+    Forking is cheap: completed patients and patients not yet admitted are
+    shared between the checkpoint and every fork (the latter are copied only
+    when a fork admits them), and only the patients in a line or in a study
+    are copied. Forks are independent of each other and of the run the
+    checkpoint was taken from.
+    """
+
+    def __init__(self, source: EventRun):
+        self.run_type = type(source)
+        self.time = source.time
+        self.time_period = source.time_period
+        self.dispatch_delay = source.dispatch_delay
+        self.make_chooser = source.make_chooser
+        self.study_defs = source.study_defs
+        self.rng_state = (random.getstate(), np.random.get_state())
+        self.completed_patients = tuple(source.completed_patients)
+        self.patient_arrival_queue = tuple(source.patient_arrival_queue)
+        self.free_locales = tuple(source.free_locales)
+        self.lines = dict(source.lines)
+        self.counter = source.counter
+        self.next_minute = source.next_minute
+        self.studies_by_name = source.studies_by_name
+        self.patient_state = source._save_patients()
+        self.queues, self.active, self.calendar = _copy_in_flight(
+            source, source.studies_by_name, source._fork_patient
+        )
+
+    def fork(
+        self,
+        locales: Dict[str, int] = None,
+        show_steps: bool = False,
+        step_callback: Callable = None,
+        event_log: Callable = None,
+    ) -> EventRun:
+        """
+        New run (of the same EventRun class) that continues from this
+        checkpoint, with the locales of the studies in `locales` changed from
+        now on. Closing locales that are busy lets their current sessions
+        finish; freed locales go to the lines at the next event. Call run()
+        on it to continue the day.
+
+        step_callback gets the minutes from the checkpoint on.
+        """
+        locales = locales or {}
+        unknown = set(locales) - set(self.study_defs)
+        if unknown:
+            raise KeyError(f"Unknown studies {sorted(unknown)}")
+        study_defs = {
+            name: Study(name, locales[name], study.time) if name in locales else study
+            for name, study in self.study_defs.items()
+        }
+        studies_by_name = study_defs if locales else self.studies_by_name
+
+        fork = self.run_type.__new__(self.run_type)
+        fork.make_chooser = self.make_chooser
+        fork._restore_patients(self.patient_state)
+        fork.choose_study = fork._chooser(study_defs)
+        fork.study_defs = study_defs
+        fork.time_period = self.time_period
+        fork.dispatch_delay = self.dispatch_delay
+        fork.show_steps = show_steps
+        fork.workflow_profile = None
+        fork.step_callback = step_callback
+        fork.event_log = event_log
+        fork.study_index = {name: i for i, name in enumerate(study_defs.keys())}
+        fork.patient_arrival_queue = deque(self.patient_arrival_queue)
+        fork.queues, fork.active, fork.calendar = _copy_in_flight(
+            self, studies_by_name, self.run_type._fork_patient
+        )
+        fork.free_locales = [
+            free + study_defs[name].locales - self.study_defs[name].locales
+            for free, name in zip(self.free_locales, study_defs)
+        ]
+        fork.lines = dict(self.lines)
+        fork.completed_patients = list(self.completed_patients)
+        fork.counter = self.counter
+        fork.next_minute = self.next_minute
+        fork.time = self.time
+        fork.copy_on_admit = True
+        fork.studies_by_name = studies_by_name
+        fork.rng_state = self.rng_state
+
+        # Opened locales take the head of their lines right away
+        for s_idx, name in enumerate(study_defs):
+            if name in locales and fork.free_locales[s_idx] > 0 and fork.queues[s_idx]:
+                fork.counter += 1
+                heapq.heappush(
+                    fork.calendar, (self.time, LOCALE_FREE, s_idx, fork.counter, None, None)
+                )
+        return fork
+
+
+def _copy_in_flight(
+    source, studies_by_name: Dict[str, Study] = None, copy_patient: Callable = _copy_patient
+):
+    """Copies of the queues, active sessions and calendar, with their own patients."""
+    copies: Dict[int, Patient] = {}
+
+    def patient_copy(patient: Patient) -> Patient:
+        if id(patient) not in copies:
+            copies[id(patient)] = copy_patient(patient, studies_by_name)
+        return copies[id(patient)]
+
+    def study(study_obj: Study) -> Study:
+        return study_obj if studies_by_name is None else studies_by_name.get(study_obj.name, study_obj)
+
+    queues = [
+        deque((entered, seq, patient_copy(patient), study(study_obj)) for entered, seq, patient, study_obj in queue)
+        for queue in source.queues
+    ]
+    active = [{seq: patient_copy(patient) for seq, patient in sessions.items()} for sessions in source.active]
+    calendar = [
+        (when, kind, s_idx, seq, patient_copy(payload), study(study_obj))
+        if kind == FINISH else (when, kind, s_idx, seq, payload, study_obj)
+        for when, kind, s_idx, seq, payload, study_obj in source.calendar
+    ]
+    # Same entries in the same order, so the list is still a heap
+    return queues, active, calendar
+
+
+def start_workflow_events(
+    get_fastest_study_func,
+    initial_patient_list: List[Patient],
+    study_defs: Dict[str, Study],
+    time_period: int,
+    admission_schedule: Dict[tuple, float] | AdmissionSchedule = None,
+    default_initial_admission_rate: float = 1.0,
+    show_steps: bool = True,
+    lookahead=1,
+    dispatch_delay: float = 1.0,
+    profile: bool = False,
+    step_callback: Callable = None,
+    event_log: Callable = None,
+) -> EventRun:
+    """
+    simulate_workflow_events without running it: draws the admissions and
+    returns the EventRun, so it can be run up to a time and checkpointed.
+
+        run = start_workflow_events(get_fastest_study_dp, patients, study_defs, 1440,
+                                    admission_schedule, show_steps=False)
+        run.run(until=600)
+        checkpoint = run.checkpoint()
+        base = checkpoint.fork().run()
+        second_rem = checkpoint.fork({"rem": 2}).run()
+    """
+    workflow_profile = None
+    if profile:
+        workflow_profile = WorkflowProfile(study_defs.keys())
+        get_fastest_study_func = workflow_profile.timed_router(get_fastest_study_func)
+    admission_counts = draw_admission_counts(
+        time_period, admission_schedule, default_initial_admission_rate
+    )
+
+    def choose_fastest_study(patient: Patient, lines: Dict[str, int]) -> Study | None:
+        return get_fastest_study_func(patient.studies_remaining, lines, lookahead)
+
+    return EventRun(
+        lambda defs: choose_fastest_study,
+        initial_patient_list,
+        study_defs,
+        time_period,
+        admission_counts,
+        dispatch_delay,
+        show_steps,
+        workflow_profile,
+        step_callback,
+        event_log,
+    )
+
+
+def simulate_workflow_events(
+    get_fastest_study_func,
+    initial_patient_list: List[Patient],
+    study_defs: Dict[str, Study],
+    time_period: int,
+    admission_schedule: Dict[tuple, float] | AdmissionSchedule = None,
+    default_initial_admission_rate: float = 1.0,
+    show_steps: bool = True,
+    lookahead=1,
+    dispatch_delay: float = 1.0,
+    profile: bool = False,
+    step_callback: Callable = None,
+    event_log: Callable = None,
+):
+    """
+    Discrete-event version of simulate_workflow.
+
+    Instead of visiting every minute, the engine jumps between arrival,
+    study-finish and locale-free events kept in a heap. Study times may be
+    non-integer. dispatch_delay is the minimum time between joining a line and
+    starting the study; with the default of 1.0 and integer study times the
+    result dict (and every wait time) matches simulate_workflow.
+
+    profile=True adds the same "profile" entry as simulate_workflow, with the
+    phases timed per event time instead of per minute. step_callback still
+    gets one call per minute, as in simulate_workflow.
+
+    event_log, if given, is called with (time, event, patient id_num, study
+    name) each time a patient joins a line ("queue"), starts a study
+    ("start") or finishes one ("finish"), in the order they happen.
+    """
+    return start_workflow_events(
+        get_fastest_study_func,
+        initial_patient_list,
+        study_defs,
+        time_period,
+        admission_schedule,
+        default_initial_admission_rate,
+        show_steps,
+        lookahead,
+        dispatch_delay,
+        profile,
+        step_callback,
+        event_log,
+    ).run()
+
+
+def _random_chooser(study_defs: Dict[str, Study]) -> Callable:
+    def choose_random_study(patient: Patient, lines: Dict[str, int]) -> Study | None:
+        performable_studies = [
+            s
+            for s in patient.studies_remaining
+            if s.name in study_defs and study_defs[s.name].locales > 0
+        ]
+        if performable_studies:
+            return random.choice(performable_studies)
+        return None
+
+    return choose_random_study
+
+
+def start_workflow_random_events(
+    initial_patient_list: List[Patient],
+    study_defs: Dict[str, Study],
+    time_period: int,
+    admission_schedule: Dict[tuple, float] | AdmissionSchedule = None,
+    default_initial_admission_rate: float = 1.0,
+    show_steps: bool = True,
+    dispatch_delay: float = 1.0,
+    step_callback: Callable = None,
+    event_log: Callable = None,
+) -> EventRun:
+    """simulate_workflow_random_events without running it, as start_workflow_events."""
+    admission_counts = draw_admission_counts(
+        time_period, admission_schedule, default_initial_admission_rate
+    )
+    return EventRun(
+        _random_chooser,
+        initial_patient_list,
+        study_defs,
+        time_period,
+        admission_counts,
+        dispatch_delay,
+        show_steps,
+        step_callback=step_callback,
+        event_log=event_log,
+    )
+
+
+def simulate_workflow_random_events(
+    initial_patient_list: List[Patient],
+    study_defs: Dict[str, Study],
+    time_period: int,
+    admission_schedule: Dict[tuple, float] | AdmissionSchedule = None,
+    default_initial_admission_rate: float = 1.0,
+    show_steps: bool = True,
+    dispatch_delay: float = 1.0,
+    step_callback: Callable = None,
+    event_log: Callable = None,
+):
+    """Discrete-event version of simulate_workflow_random."""
+    return start_workflow_random_events(
+        initial_patient_list,
+        study_defs,
+        time_period,
+        admission_schedule,
+        default_initial_admission_rate,
+        show_steps,
+        dispatch_delay,
+        step_callback,
+        event_log,
+    ).run()
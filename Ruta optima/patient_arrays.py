@@ -0,0 +1,286 @@
+import copy
+import random
+from typing import List, Dict, Any, Callable
+import numpy as np
+
+from SimFinal import Patient, Study
+from admission_schedule import AdmissionSchedule
+from event_engine import EventRun, draw_admission_counts
+
+
+class PatientArrays:
+    """
+    Structure-of-arrays state for a whole cohort of patients.
+
+    Studies are referred to by their position in study_defs and each patient's
+    studies are a bitmask (bit i set = study i still to do). Waits and queue
+    entry times live in float arrays, so a cohort of any size is a handful of
+    NumPy arrays instead of Patient objects with Study lists. The bitmask
+    keeps which studies a patient has left, not the order they were listed
+    in.
+    """
+
+    def __init__(
+        self,
+        study_defs: Dict[str, Study],
+        required: np.ndarray,
+        id_num: np.ndarray = None,
+    ):
+        self.study_names = list(study_defs.keys())
+        self.required = np.asarray(required, dtype=np.int64)
+        self.remaining = self.required.copy()
+        self.id_num = (
+            np.arange(len(self.required)) if id_num is None else np.asarray(id_num)
+        )
+        self.total_wait_time = np.zeros(len(self.required))
+        # 0.0 until the first queue, -1.0 while in a session, as in Patient
+        self.time_entered_current_queue = np.zeros(len(self.required))
+
+    def __len__(self):
+        return len(self.required)
+
+    def copy(self) -> "PatientArrays":
+        """Copy with its own progress arrays; required and id_num are shared."""
+        copied = copy.copy(self)
+        copied.remaining = self.remaining.copy()
+        copied.total_wait_time = self.total_wait_time.copy()
+        copied.time_entered_current_queue = self.time_entered_current_queue.copy()
+        return copied
+
+    @classmethod
+    def from_patients(cls, patients: List[Patient], study_defs: Dict[str, Study]):
+        bit = {name: 1 << i for i, name in enumerate(study_defs.keys())}
+        required = [
+            sum(bit[s.name] for s in p.studies_remaining) for p in patients
+        ]
+        return cls(study_defs, required, [p.id_num for p in patients])
+
+    def studies_of(self, mask: int) -> List[str]:
+        """Names of the studies in a bitmask, in study_defs order."""
+        return [name for i, name in enumerate(self.study_names) if mask >> i & 1]
+
+
+class PatientArraysRun(EventRun):
+    """
+    EventRun whose patients are indices into a PatientArrays cohort.
+
+    make_chooser(study_defs) returns choose_study(mask, lines) -> Study | None,
+    which routes a patient by the bitmask of their remaining studies.
+    Progress is kept in lists while running and written back to the arrays
+    by result(); run() returns patients as arrays of id_num. checkpoint()
+    copies those lists, and every fork writes to its own PatientArrays.
+    """
+
+    def __init__(
+        self,
+        make_chooser: Callable[[Dict[str, Study]], Callable[[int, Dict[str, int]], Study | None]],
+        patients: PatientArrays,
+        study_defs: Dict[str, Study],
+        time_period: int,
+        admission_counts: np.ndarray,
+        dispatch_delay: float,
+    ):
+        self.patients = patients
+        self.bit = {name: 1 << i for i, name in enumerate(patients.study_names)}
+        self.remaining = patients.remaining.tolist()
+        self.total_wait = patients.total_wait_time.tolist()
+        self.entered_at = patients.time_entered_current_queue.tolist()
+        super().__init__(
+            make_chooser, range(len(patients)), study_defs,
+            time_period, admission_counts, dispatch_delay, show_steps=False,
+        )
+
+    def _chooser(self, study_defs: Dict[str, Study]) -> Callable:
+        choose_study = self.make_chooser(study_defs)
+        remaining = self.remaining
+
+        def choose_by_mask(p: int, lines: Dict[str, int]) -> Study | None:
+            return choose_study(remaining[p], lines)
+
+        return choose_by_mask
+
+    @staticmethod
+    def _fork_patient(p: int, studies_by_name: Dict[str, Study] = None) -> int:
+        return p
+
+    def _save_patients(self):
+        return self.patients, self.remaining[:], self.total_wait[:], self.entered_at[:]
+
+    def _restore_patients(self, state):
+        patients, remaining, total_wait, entered_at = state
+        self.patients = patients.copy()
+        self.bit = {name: 1 << i for i, name in enumerate(patients.study_names)}
+        self.remaining = remaining[:]
+        self.total_wait = total_wait[:]
+        self.entered_at = entered_at[:]
+
+    def _admit(self, p: int) -> int:
+        if not self.remaining[p]:
+            self.entered_at[p] = -1.0
+        return p
+
+    def _needs_studies(self, p: int) -> bool:
+        return self.remaining[p] != 0
+
+    def _join_line(self, p: int, now: float):
+        self.entered_at[p] = now
+
+    def _leave_line(self, p: int, now: float) -> float | None:
+        entered = self.entered_at[p]
+        self.entered_at[p] = -1.0
+        if entered == -1.0:
+            return None
+        self.total_wait[p] += now - entered
+        return now - entered
+
+    def _finish_study(self, p: int, study_obj: Study):
+        self.remaining[p] &= ~self.bit[study_obj.name]
+
+    def result(self) -> Dict[str, Any]:
+        patients = self.patients
+        patients.remaining[:] = self.remaining
+        patients.total_wait_time[:] = self.total_wait
+        patients.time_entered_current_queue[:] = self.entered_at
+
+        completed_idx = np.array(self.completed_patients, dtype=np.int64)
+        if len(completed_idx):
+            average_wait_time_completed = float(
+                patients.total_wait_time[completed_idx].mean()
+            )
+        else:
+            average_wait_time_completed = 0.0
+
+        still_waiting = sorted((entry for queue in self.queues for entry in queue), key=lambda e: e[1])
+        ids = patients.id_num
+        return {
+            "completed_patients": ids[completed_idx],
+            "waiting_patients_final_state_objects": ids[
+                np.array([entry[2] for entry in still_waiting], dtype=np.int64)
+            ],
+            "active_sessions_final_state_patients": ids[
+                np.array([p for sessions in self.active for p in sessions.values()], dtype=np.int64)
+            ],
+            "lines": self.lines,
+            "still_in_arrival_queue": ids[np.array(list(self.patient_arrival_queue), dtype=np.int64)],
+            "average_wait_time_completed": average_wait_time_completed,
+        }
+
+
+def start_workflow_arrays(
+    get_fastest_study_func,
+    patients: PatientArrays,
+    study_defs: Dict[str, Study],
+    time_period: int,
+    admission_schedule: Dict[tuple, float] | AdmissionSchedule = None,
+    default_initial_admission_rate: float = 1.0,
+    lookahead=1,
+    dispatch_delay: float = 1.0,
+) -> PatientArraysRun:
+    """
+    simulate_workflow_arrays without running it, as start_workflow_events:
+    the returned run can be run up to a time, checkpointed and forked.
+    """
+    admission_counts = draw_admission_counts(
+        time_period, admission_schedule, default_initial_admission_rate
+    )
+
+    def make_chooser(study_defs: Dict[str, Study]) -> Callable:
+        studies_by_mask: Dict[int, List[Study]] = {}
+
+        def choose_study(mask: int, lines: Dict[str, int]) -> Study | None:
+            studies = studies_by_mask.get(mask)
+            if studies is None:
+                studies = [study_defs[name] for name in patients.studies_of(mask)]
+                studies_by_mask[mask] = studies
+            return get_fastest_study_func(studies, lines, lookahead)
+
+        return choose_study
+
+    return PatientArraysRun(
+        make_chooser, patients, study_defs, time_period, admission_counts, dispatch_delay
+    )
+
+
+def simulate_workflow_arrays(
+    get_fastest_study_func,
+    patients: PatientArrays,
+    study_defs: Dict[str, Study],
+    time_period: int,
+    admission_schedule: Dict[tuple, float] | AdmissionSchedule = None,
+    default_initial_admission_rate: float = 1.0,
+    lookahead=1,
+    dispatch_delay: float = 1.0,
+):
+    """
+    simulate_workflow_events running directly on a PatientArrays cohort.
+
+    get_fastest_study_func is called with the shared Study objects of the
+    remaining studies in study_defs order. The result dict has the same keys
+    as simulate_workflow, but patients are returned as arrays of id_num; their
+    waits are left in patients.total_wait_time.
+
+    A bitmask does not keep the order of a patient's studies, so when two
+    studies tie the router picks the first in study_defs order. Results match
+    simulate_workflow_events on patients whose studies are listed in that
+    order, and may differ on ties otherwise.
+    """
+    return start_workflow_arrays(
+        get_fastest_study_func, patients, study_defs, time_period, admission_schedule,
+        default_initial_admission_rate, lookahead, dispatch_delay,
+    ).run()
+
+
+def start_workflow_random_arrays(
+    patients: PatientArrays,
+    study_defs: Dict[str, Study],
+    time_period: int,
+    admission_schedule: Dict[tuple, float] | AdmissionSchedule = None,
+    default_initial_admission_rate: float = 1.0,
+    dispatch_delay: float = 1.0,
+) -> PatientArraysRun:
+    """simulate_workflow_random_arrays without running it, as start_workflow_arrays."""
+    admission_counts = draw_admission_counts(
+        time_period, admission_schedule, default_initial_admission_rate
+    )
+
+    def make_chooser(study_defs: Dict[str, Study]) -> Callable:
+        performable_by_mask: Dict[int, List[Study]] = {}
+
+        def choose_random_study(mask: int, lines: Dict[str, int]) -> Study | None:
+            performable_studies = performable_by_mask.get(mask)
+            if performable_studies is None:
+                performable_studies = [
+                    study_defs[name]
+                    for name in patients.studies_of(mask)
+                    if study_defs[name].locales > 0
+                ]
+                performable_by_mask[mask] = performable_studies
+            if performable_studies:
+                return random.choice(performable_studies)
+            return None
+
+        return choose_random_study
+
+    return PatientArraysRun(
+        make_chooser, patients, study_defs, time_period, admission_counts, dispatch_delay
+    )
+
+
+def simulate_workflow_random_arrays(
+    patients: PatientArrays,
+    study_defs: Dict[str, Study],
+    time_period: int,
+    admission_schedule: Dict[tuple, float] | AdmissionSchedule = None,
+    default_initial_admission_rate: float = 1.0,
+    dispatch_delay: float = 1.0,
+):
+    """
+    simulate_workflow_random_events running directly on a PatientArrays
+    cohort. random.choice picks among the remaining studies in study_defs
+    order, so the draws match simulate_workflow_random_events only on
+    patients whose studies are listed in that order.
+    """
+    return start_workflow_random_arrays(
+        patients, study_defs, time_period, admission_schedule,
+        default_initial_admission_rate, dispatch_delay,
+    ).run()
@@ -0,0 +1,130 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Iterable, Tuple
+import numpy as np
+import pandas as pd
+
+from SimFinal import Patient, Study, simulate_workflow, simulate_workflow_random
+from cohorts import Cohorts
+from event_engine import simulate_workflow_events, simulate_workflow_random_events
+from router import get_fastest_study_dp
+
+
+# (lookahead engine, random engine) for each time-advance method
+ENGINES = {
+    "tick": (simulate_workflow, simulate_workflow_random),
+    "events": (simulate_workflow_events, simulate_workflow_random_events),
+}
+
+STRATEGIES = ("lookahead", "random")
+
+
+def generate_patients(
+    rng: np.random.Generator,
+    n: int,
+    study_defs: Dict[str, Study],
+    min_studies: int,
+    max_studies: int,
+) -> List[Patient]:
+    """
+    Same cohort model as generate_patients in FinalSimulation.ipynb, drawn
+    with Cohorts. Patients share the Study objects of study_defs instead of
+    deep copies; the simulators never modify a Study.
+    """
+    return Cohorts.draw(rng, study_defs, n, 1, min_studies, max_studies).patients(0)
+
+
+def _run_job(job: Tuple) -> Dict:
+    (strategy, lookahead, seed, study_defs, admission_schedule,
+     n_patients, min_studies, max_studies, time_period, engine) = job
+
+    # One stream for the cohort and one for the engine, both derived from the
+    # seed alone, so a run does not depend on which worker picked it up.
+    cohort_seed, engine_seed = np.random.SeedSequence(seed).spawn(2)
+    rng = np.random.default_rng(cohort_seed)
+    engine_state = int(engine_seed.generate_state(1)[0])
+    np.random.seed(engine_state)
+    random.seed(engine_state)
+
+    patients = generate_patients(rng, n_patients, study_defs, min_studies, max_studies)
+    simulate, simulate_random = ENGINES[engine]
+    if strategy == "lookahead":
+        final_state = simulate(
+            get_fastest_study_dp,
+            initial_patient_list=patients,
+            study_defs=study_defs,
+            time_period=time_period,
+            admission_schedule=admission_schedule,
+            show_steps=False,
+            lookahead=lookahead,
+        )
+    elif strategy == "random":
+        final_state = simulate_random(
+            initial_patient_list=patients,
+            study_defs=study_defs,
+            time_period=time_period,
+            admission_schedule=admission_schedule,
+            show_steps=False,
+        )
+    else:
+        raise ValueError(f"Unknown strategy {strategy!r}, expected one of {STRATEGIES}")
+
+    return {
+        "strategy": strategy,
+        "lookahead": lookahead,
+        "seed": seed,
+        "average_wait_time_completed": final_state["average_wait_time_completed"],
+        "num_completed": len(final_state["completed_patients"]),
+    }
+
+
+def run_replications(
+    study_defs: Dict[str, Study],
+    admission_schedule: Dict[tuple, float],
+    lookaheads: Iterable[int] = range(7),
+    seeds: Iterable[int] = range(100),
+    strategies: Iterable[str] = STRATEGIES,
+    n_patients: int = 950,
+    min_studies: int = 1,
+    max_studies: int = 7,
+    time_period: int = 1440,
+    engine: str = "events",
+    max_workers: int = None,
+) -> pd.DataFrame:
+    """
+    Runs every (strategy, lookahead, seed) replication across a process pool.
+
+    The random strategy ignores lookahead and runs once per seed. A given seed
+    gives the same cohort and admissions to every strategy, and the same
+    numbers on every run. max_workers=1 runs in the current process.
+
+    Returns one row per run with strategy, lookahead, seed,
+    average_wait_time_completed and num_completed.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {tuple(ENGINES)}")
+
+    seeds = list(seeds)
+    jobs = []
+    for strategy in strategies:
+        strategy_lookaheads = list(lookaheads) if strategy == "lookahead" else [None]
+        for lookahead in strategy_lookaheads:
+            for seed in seeds:
+                jobs.append(
+                    (strategy, lookahead, seed, study_defs, admission_schedule,
+                     n_patients, min_studies, max_studies, time_period, engine)
+                )
+
+    if max_workers == 1:
+        rows = [_run_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            rows = list(executor.map(_run_job, jobs, chunksize=max(1, len(jobs) // 64)))
+
+    results = pd.DataFrame(
+        rows,
+        columns=["strategy", "lookahead", "seed", "average_wait_time_completed", "num_completed"],
+    )
+    # Nullable ints so the random strategy's missing lookahead stays <NA>
+    results["lookahead"] = results["lookahead"].astype("Int64")
+    return results
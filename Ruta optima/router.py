@@ -0,0 +1,125 @@
+from functools import lru_cache
+from typing import List, Dict, Tuple
+
+from SimFinal import Study
+
+
+def _best_first_index(
+    key: Tuple[Tuple[str, int, float, int], ...], depth: int
+) -> int:
+    """
+    Position (within key) of the study that should be done first.
+
+    key holds one (name, locales, time, cycle) entry per performable study, in
+    the patient's order; cycle is line_length // locales, i.e. how many full
+    rounds of the study the patient would have to wait.
+    """
+    waits = [cycle * time for _, _, time, cycle in key]
+
+    # Same rule as the original get_fastest_study: shortest wait, last one on ties
+    if depth == 1:
+        best = 0
+        for i, wait in enumerate(waits):
+            if wait <= waits[best]:
+                best = i
+        return best
+
+    costs = [wait + time for wait, (_, _, time, _) in zip(waits, key)]
+    n = len(costs)
+
+    # Joining a line only changes that study's own line, so the cost of every
+    # study is the same whatever position it takes in the sequence. The best
+    # sequence is therefore decided by the subset of studies it visits:
+    # subset_cost[mask] is the total time of the studies in the bitmask.
+    subset_cost = [0] * (1 << n)
+    subset_size = [0] * (1 << n)
+    for mask in range(1, 1 << n):
+        low = mask & -mask
+        subset_cost[mask] = subset_cost[mask ^ low] + costs[low.bit_length() - 1]
+        subset_size[mask] = subset_size[mask ^ low] + 1
+
+    # best_rest[mask] is the cheapest way to do depth - 1 more studies taken
+    # from the studies in mask
+    rest_depth = max(depth - 1, 0)
+    best_rest = [float("inf")] * (1 << n)
+    for mask in range(1 << n):
+        if subset_size[mask] == rest_depth:
+            best_rest[mask] = subset_cost[mask]
+    for mask in range(1 << n):
+        for j in range(n):
+            bit = 1 << j
+            if mask & bit and best_rest[mask ^ bit] < best_rest[mask]:
+                best_rest[mask] = best_rest[mask ^ bit]
+
+    full = (1 << n) - 1
+    best_first = 0
+    best_total_time = float("inf")
+    for i in range(n):
+        total_time = costs[i] + best_rest[full ^ (1 << i)]
+        if total_time < best_total_time:
+            best_total_time = total_time
+            best_first = i
+    return best_first
+
+
+class LookaheadRouter:
+    """
+    Drop-in replacement for get_fastest_study_lookahead.
+
+    Picks the same study as the permutation search, but solves the lookahead
+    with a subset DP over bitmasks of the remaining studies, and keeps the
+    answers in an LRU cache keyed on the remaining studies and their line
+    lengths quantized to full rounds (line_length // locales). The rounds are
+    all the wait estimate depends on, so the cache never changes an answer.
+
+    Instances are callable with the (patient_remaining_studies, lines,
+    lookahead_depth) signature expected by simulate_workflow.
+    """
+
+    def __init__(self, cache_size: int = 100_000):
+        self.cache_size = cache_size
+        self._best_first_index = lru_cache(maxsize=cache_size)(_best_first_index)
+
+    def __call__(
+        self,
+        patient_remaining_studies: List[Study],
+        lines: Dict[str, int],
+        lookahead_depth: int = 1,
+    ) -> Study | None:
+        if not patient_remaining_studies:
+            return None
+
+        # Filter out studies with no available locales
+        valid_studies = [
+            study for study in patient_remaining_studies if study.locales > 0
+        ]
+        if not valid_studies:
+            return None
+
+        if len(valid_studies) == 1 or lookahead_depth == 1:
+            depth = 1
+        else:
+            depth = max(0, min(lookahead_depth, len(valid_studies)))
+
+        key = tuple(
+            (s.name, s.locales, s.time, lines.get(s.name, 0) // s.locales)
+            for s in valid_studies
+        )
+        return valid_studies[self._best_first_index(key, depth)]
+
+    def cache_info(self):
+        return self._best_first_index.cache_info()
+
+    def cache_clear(self):
+        self._best_first_index.cache_clear()
+
+    def __getstate__(self):
+        # The cache itself is not sent to worker processes
+        return {"cache_size": self.cache_size}
+
+    def __setstate__(self, state):
+        self.__init__(state["cache_size"])
+
+
+# Shared router with the same signature as get_fastest_study_lookahead
+get_fastest_study_dp = LookaheadRouter()
@@ -0,0 +1,356 @@
+"""
+Live routing of real patients with the same rule as the simulators.
+
+    service = RoutingService(studies_definitions, lookahead=5)
+    service.check_in(17, ["rayosx", "laboratorio", "ultrasonido"])
+    service.route(17)        # -> "laboratorio", and the patient joins that line
+    service.start(17)        # called into a locale
+    service.finish(17)       # done with it; route(17) again for the next one
+
+From the command line:
+
+    python routing_service.py serve studies.json --port 8765 --lookahead 5
+    python routing_service.py replay studies.json --patients 950 --lookahead 5
+
+studies.json maps each study name to {"locales": n, "time": minutes}.
+"""
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Hashable, Iterable, List, Tuple
+import numpy as np
+
+from SimFinal import Study
+from router import LookaheadRouter
+
+LINE, SESSION = "line", "session"
+
+
+class RoutingService:
+    """
+    Live line counts per study and "next study" answers for checked-in patients.
+
+    Line counts are updated incrementally by route/join_line (patient joins a
+    line), start (leaves the line for a locale), finish and leave. Routing uses
+    a LookaheadRouter, whose cache keeps repeated situations at a dictionary
+    lookup even at lookahead 5 and above. All methods are thread-safe.
+    """
+
+    def __init__(
+        self,
+        study_defs: Dict[str, Study],
+        lookahead: int = 1,
+        router: LookaheadRouter = None,
+        latency_window: int = 10_000,
+    ):
+        self.study_defs = dict(study_defs)
+        self.lookahead = lookahead
+        self.router = router if router is not None else LookaheadRouter()
+        self.lines: Dict[str, int] = {name: 0 for name in self.study_defs}
+        self.in_session: Dict[str, int] = {name: 0 for name in self.study_defs}
+        # patient -> [remaining study names, (LINE | SESSION, study name) or None]
+        self._patients: Dict[Hashable, list] = {}
+        self._latencies = deque(maxlen=latency_window)
+        self._route_calls = 0
+        self._lock = threading.Lock()
+
+    def __contains__(self, patient_id) -> bool:
+        return patient_id in self._patients
+
+    def _patient(self, patient_id) -> list:
+        try:
+            return self._patients[patient_id]
+        except KeyError:
+            raise KeyError(f"Patient {patient_id!r} is not checked in") from None
+
+    def check_in(self, patient_id, studies: Iterable[str]):
+        """Registers a patient and the studies they came for, in their order."""
+        studies = list(studies)
+        unknown = [name for name in studies if name not in self.study_defs]
+        if unknown:
+            raise ValueError(f"Unknown studies {unknown}")
+        with self._lock:
+            if patient_id in self._patients:
+                raise ValueError(f"Patient {patient_id!r} is already checked in")
+            self._patients[patient_id] = [studies, None]
+
+    def _next_study(self, remaining: List[str]) -> str | None:
+        start = time.perf_counter()
+        next_study = self.router(
+            [self.study_defs[name] for name in remaining], self.lines, self.lookahead
+        )
+        self._latencies.append(time.perf_counter() - start)
+        self._route_calls += 1
+        return next_study.name if next_study else None
+
+    def next_study(self, patient_id) -> str | None:
+        """Study the patient should do next given the current lines, without joining it."""
+        with self._lock:
+            remaining, location = self._patient(patient_id)
+            if location is not None:
+                raise ValueError(f"Patient {patient_id!r} is already in a {location[0]}")
+            return self._next_study(remaining)
+
+    def _join_line(self, patient_id, patient: list, study: str):
+        if study not in patient[0]:
+            raise ValueError(f"Patient {patient_id!r} does not need {study!r}")
+        if patient[1] is not None:
+            raise ValueError(f"Patient {patient_id!r} is already in a {patient[1][0]}")
+        self.lines[study] += 1
+        patient[1] = (LINE, study)
+
+    def join_line(self, patient_id, study: str):
+        """Puts the patient in a given line (e.g. a manual decision at the desk)."""
+        with self._lock:
+            self._join_line(patient_id, self._patient(patient_id), study)
+
+    def route(self, patient_id) -> str | None:
+        """Picks the patient's next study and puts them in its line; None if nothing is left."""
+        with self._lock:
+            patient = self._patient(patient_id)
+            if patient[1] is not None:
+                raise ValueError(f"Patient {patient_id!r} is already in a {patient[1][0]}")
+            study = self._next_study(patient[0])
+            if study is not None:
+                self._join_line(patient_id, patient, study)
+            return study
+
+    def start(self, patient_id) -> str:
+        """The patient left their line for a locale; returns the study."""
+        with self._lock:
+            patient = self._patient(patient_id)
+            if patient[1] is None or patient[1][0] != LINE:
+                raise ValueError(f"Patient {patient_id!r} is not waiting in a line")
+            study = patient[1][1]
+            self.lines[study] -= 1
+            self.in_session[study] += 1
+            patient[1] = (SESSION, study)
+            return study
+
+    def finish(self, patient_id) -> List[str]:
+        """The patient finished their current study; returns the studies still to do."""
+        with self._lock:
+            patient = self._patient(patient_id)
+            if patient[1] is None or patient[1][0] != SESSION:
+                raise ValueError(f"Patient {patient_id!r} is not in a study")
+            study = patient[1][1]
+            self.in_session[study] -= 1
+            patient[0].remove(study)
+            patient[1] = None
+            if not patient[0]:
+                del self._patients[patient_id]
+            return list(patient[0])
+
+    def leave(self, patient_id):
+        """The patient left the clinic, wherever they were."""
+        with self._lock:
+            remaining, location = self._patient(patient_id)
+            if location is not None:
+                where, study = location
+                if where == LINE:
+                    self.lines[study] -= 1
+                else:
+                    self.in_session[study] -= 1
+            del self._patients[patient_id]
+
+    def set_locales(self, study: str, locales: int):
+        """Opens or closes locales of a study; later routing takes it into account."""
+        with self._lock:
+            old = self.study_defs[study]
+            self.study_defs[study] = Study(old.name, locales, old.time)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            latencies = np.array(self._latencies) * 1e6
+            return {
+                "lines": dict(self.lines),
+                "in_session": dict(self.in_session),
+                "patients": len(self._patients),
+                "route_calls": self._route_calls,
+                "latency_us": {
+                    "p50": float(np.percentile(latencies, 50)) if len(latencies) else None,
+                    "p99": float(np.percentile(latencies, 99)) if len(latencies) else None,
+                    "max": float(latencies.max()) if len(latencies) else None,
+                },
+            }
+
+
+def replay_events(
+    service: RoutingService,
+    events: Iterable[Tuple[float, str, Hashable, str]],
+    cohort: Dict[Hashable, List[str]],
+) -> Dict:
+    """
+    Feeds a recorded day to the service and compares its routing decisions.
+
+    events are (time, event, patient, study) tuples as written by the
+    event_log of simulate_workflow_events; cohort maps each patient to the
+    studies they came for, in order. On every "queue" event the service is
+    asked for the patient's next study and the patient is then put in the
+    recorded line, so one disagreement does not change later line counts.
+    """
+    routes = 0
+    mismatches = []
+    for event_time, event, patient_id, study in events:
+        if event == "queue":
+            if patient_id not in service:
+                service.check_in(patient_id, cohort[patient_id])
+            chosen = service.next_study(patient_id)
+            routes += 1
+            if chosen != study:
+                mismatches.append((event_time, patient_id, study, chosen))
+            service.join_line(patient_id, study)
+        elif event == "start":
+            service.start(patient_id)
+        elif event == "finish":
+            service.finish(patient_id)
+    return {"routes": routes, "mismatches": mismatches, **service.snapshot()}
+
+
+def replay_simulated_day(
+    study_defs: Dict[str, Study],
+    admission_schedule,
+    n_patients: int = 950,
+    lookahead: int = 1,
+    time_period: int = 1440,
+    seed: int = 0,
+    min_studies: int = 1,
+    max_studies: int = 7,
+) -> Dict:
+    """
+    Simulates a day with simulate_workflow_events and replays it through a new service.
+
+    Patients get between min_studies and max_studies studies, capped at the
+    number of studies in study_defs.
+    """
+    from event_engine import simulate_workflow_events
+    from replications import generate_patients
+
+    max_studies = min(max_studies, len(study_defs))
+    min_studies = min(min_studies, max_studies)
+    patients = generate_patients(
+        np.random.default_rng(seed), n_patients, study_defs, min_studies, max_studies
+    )
+    cohort = {p.id_num: [s.name for s in p.studies_remaining] for p in patients}
+    events = []
+    np.random.seed(seed)
+    simulate_workflow_events(
+        LookaheadRouter(), patients, study_defs, time_period, admission_schedule,
+        show_steps=False, lookahead=lookahead,
+        event_log=lambda *event: events.append(event),
+    )
+    return replay_events(RoutingService(study_defs, lookahead), events, cohort)
+
+
+def load_studies(path) -> Dict[str, Study]:
+    with open(path) as f:
+        spec = json.load(f)
+    return {name: Study(name, s["locales"], s["time"]) for name, s in spec.items()}
+
+
+def make_handler(service: RoutingService):
+    """HTTP handler: POST /check_in, /route, /next_study, /join_line, /start, /finish, /leave, GET /snapshot."""
+    # path -> (required body fields, action)
+    actions = {
+        "/check_in": (("patient", "studies"), lambda body: service.check_in(body["patient"], body["studies"])),
+        "/route": (("patient",), lambda body: {"study": service.route(body["patient"])}),
+        "/next_study": (("patient",), lambda body: {"study": service.next_study(body["patient"])}),
+        "/join_line": (("patient", "study"), lambda body: service.join_line(body["patient"], body["study"])),
+        "/start": (("patient",), lambda body: {"study": service.start(body["patient"])}),
+        "/finish": (("patient",), lambda body: {"remaining": service.finish(body["patient"])}),
+        "/leave": (("patient",), lambda body: service.leave(body["patient"])),
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/snapshot":
+                self._reply(200, service.snapshot())
+            else:
+                self._reply(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path not in actions:
+                self._reply(404, {"error": f"Unknown path {self.path}"})
+                return
+            fields, action = actions[self.path]
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(body, dict):
+                    raise ValueError("The request body must be a JSON object")
+                for field in fields:
+                    if field not in body:
+                        raise ValueError(f"missing field {field!r}")
+                result = action(body)
+            except KeyError as e:
+                # Unknown patients; missing fields are checked above
+                self._reply(404, {"error": e.args[0]})
+            except (ValueError, TypeError) as e:
+                self._reply(400, {"error": str(e)})
+            else:
+                self._reply(200, result if result is not None else {"ok": True})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Live routing service for patients' next study")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="run the HTTP front end")
+    serve.add_argument("studies", help="JSON file: study -> {locales, time}")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--lookahead", type=int, default=1)
+
+    replay = commands.add_parser("replay", help="replay a simulated day through the service")
+    replay.add_argument("studies", help="JSON file: study -> {locales, time}")
+    replay.add_argument("--patients", type=int, default=950)
+    replay.add_argument("--lookahead", type=int, default=1)
+    replay.add_argument("--rate", type=float, default=None,
+                        help="admissions per minute over the first 8 hours (default: patients / 480)")
+    replay.add_argument("--seed", type=int, default=0)
+    replay.add_argument("--min-studies", type=int, default=1)
+    replay.add_argument("--max-studies", type=int, default=7,
+                        help="capped at the number of studies in the file (default: 7)")
+
+    args = parser.parse_args(argv)
+    study_defs = load_studies(args.studies)
+
+    if args.command == "serve":
+        service = RoutingService(study_defs, args.lookahead)
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+        print(f"Routing service on http://{args.host}:{args.port} (lookahead {args.lookahead})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    else:
+        rate = args.rate if args.rate is not None else args.patients / 480
+        result = replay_simulated_day(
+            study_defs, {(0, 480): rate, (480, 1440): 0.0},
+            n_patients=args.patients, lookahead=args.lookahead, seed=args.seed,
+            min_studies=args.min_studies, max_studies=args.max_studies,
+        )
+        result["mismatches"] = len(result["mismatches"])
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
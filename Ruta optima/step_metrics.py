@@ -0,0 +1,142 @@
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+
+from SimFinal import Study
+
+
+class StepMetrics:
+    """
+    Per-minute snapshots of a simulation, stored in preallocated NumPy arrays.
+
+    Pass an instance as step_callback to simulate_workflow (or any of its
+    engines). At the end of every time step it receives the lines per study,
+    the active sessions per study, the number of patients completed so far
+    and how long the head of each line has been waiting. Only every `every`-th
+    step is kept. completed is cumulative, so downsampling loses no
+    completions; the other columns are point-in-time values.
+
+    Arrays have one row per kept step and one column per study, in
+    study_defs order. oldest_wait is NaN when a line is empty.
+    """
+
+    def __init__(self, study_defs: Dict[str, Study], time_period: int, every: int = 1):
+        if every < 1:
+            raise ValueError(f"every must be at least 1, got {every}")
+        self.study_names = list(study_defs.keys())
+        self.locales = np.array([study_defs[name].locales for name in self.study_names])
+        self.every = every
+        self.day = 0
+        self._allocate(-(-time_period // every))
+
+    def _allocate(self, rows: int):
+        n_studies = len(self.study_names)
+        self.size = 0
+        self.day_column = np.zeros(rows, dtype=np.int32)
+        self.time = np.zeros(rows, dtype=np.int32)
+        self.completed = np.zeros(rows, dtype=np.int64)
+        self.lines = np.zeros((rows, n_studies), dtype=np.int32)
+        self.active = np.zeros((rows, n_studies), dtype=np.int32)
+        self.oldest_wait = np.full((rows, n_studies), np.nan, dtype=np.float32)
+
+    def __call__(
+        self,
+        time_step: int,
+        lines: Dict[str, int],
+        active_counts: List[int],
+        num_completed: int,
+        oldest_wait: List[float],
+    ):
+        if time_step % self.every:
+            return
+        if self.size == len(self.time):
+            self._full()
+        row = self.size
+        self.day_column[row] = self.day
+        self.time[row] = time_step
+        self.completed[row] = num_completed
+        self.lines[row] = [lines.get(name, 0) for name in self.study_names]
+        self.active[row] = active_counts
+        self.oldest_wait[row] = oldest_wait
+        self.size += 1
+
+    def _full(self):
+        # Several runs (e.g. one per day) can share an instance; double the arrays.
+        for name in ("day_column", "time", "completed", "lines", "active", "oldest_wait"):
+            array = getattr(self, name)
+            grown = np.empty((2 * len(array),) + array.shape[1:], dtype=array.dtype)
+            grown[: len(array)] = array
+            setattr(self, name, grown)
+
+    @property
+    def utilization(self) -> np.ndarray:
+        """Fraction of the locales of each study in use at every kept step."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.active[: self.size] / self.locales
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Flat columns: day, time, completed, then lines_/active_/oldest_wait_<study>."""
+        n = self.size
+        flat = {"day": self.day_column[:n], "time": self.time[:n], "completed": self.completed[:n]}
+        for prefix, values in (
+            ("lines", self.lines), ("active", self.active), ("oldest_wait", self.oldest_wait)
+        ):
+            for i, name in enumerate(self.study_names):
+                flat[f"{prefix}_{name}"] = values[:n, i]
+        return flat
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(self.columns())
+
+    def clear(self):
+        self.size = 0
+
+
+class ParquetStepWriter(StepMetrics):
+    """
+    StepMetrics that appends its rows to a Parquet file in chunks.
+
+    Only chunk_steps rows are held in memory; each full chunk is written as a
+    row group. Set the day attribute before each run to simulate several days
+    into one file, and close() (or use a with block) at the end. Needs pyarrow.
+    """
+
+    def __init__(
+        self,
+        path,
+        study_defs: Dict[str, Study],
+        every: int = 1,
+        chunk_steps: int = 7 * 1440,
+    ):
+        import pyarrow  # noqa: F401  (fail early when it is missing)
+
+        super().__init__(study_defs, chunk_steps * every, every)
+        self.path = path
+        self._writer = None
+
+    def _full(self):
+        self.flush()
+
+    def flush(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self.size:
+            return
+        table = pa.table(self.columns())
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+        self.clear()
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
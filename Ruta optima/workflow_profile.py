@@ -0,0 +1,63 @@
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable
+
+# The four phases of one time step of simulate_workflow
+PHASES = ("process_sessions", "assign_waiting", "reassign_finished", "admit_arrivals")
+
+# Upper edges (microseconds) of the router latency histogram buckets
+LATENCY_BUCKETS_US = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class WorkflowProfile:
+    """
+    Instrumentation collected by simulate_workflow(..., profile=True).
+
+    Keeps the cumulative time spent in each phase, the number of calls to
+    get_fastest_study_func with a latency histogram, and the longest line seen
+    for every study. Router time is also counted in the phase that made the
+    call, so routing and bookkeeping can be told apart.
+    """
+
+    def __init__(self, study_names: Iterable[str]):
+        self.phase_time: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.router_calls = 0
+        self.router_time = 0.0
+        self.latency_counts = [0] * (len(LATENCY_BUCKETS_US) + 1)
+        self.peak_lines: Dict[str, int] = dict.fromkeys(study_names, 0)
+
+    def timed_router(self, get_fastest_study_func: Callable) -> Callable:
+        """Wraps the routing function so that every call is counted and timed."""
+
+        def timed(*args):
+            start = time.perf_counter()
+            next_study = get_fastest_study_func(*args)
+            elapsed = time.perf_counter() - start
+            self.router_calls += 1
+            self.router_time += elapsed
+            self.latency_counts[bisect_left(LATENCY_BUCKETS_US, elapsed * 1e6)] += 1
+            return next_study
+
+        return timed
+
+    def end_phase(self, phase: str, start: float) -> float:
+        """Adds the time since start to phase and returns the current time."""
+        now = time.perf_counter()
+        self.phase_time[phase] += now - start
+        return now
+
+    def observe_lines(self, lines: Dict[str, int]):
+        for name, length in lines.items():
+            if length > self.peak_lines.get(name, 0):
+                self.peak_lines[name] = length
+
+    def to_dict(self) -> Dict:
+        labels = [f"<={edge}us" for edge in LATENCY_BUCKETS_US]
+        labels.append(f">{LATENCY_BUCKETS_US[-1]}us")
+        return {
+            "phase_time": dict(self.phase_time),
+            "router_calls": self.router_calls,
+            "router_time": self.router_time,
+            "router_latency_histogram": dict(zip(labels, self.latency_counts)),
+            "peak_lines": dict(self.peak_lines),
+        }
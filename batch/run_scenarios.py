@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+Headless runner for Ruta optima and Fila de espera scenarios.
+
+Reads JSON scenario files and writes the results of each one to
+<output>/<name>/: one Parquet file per table (JSON with --format json) and
+a summary.json with the scenario, timings and the headline numbers.
+
+    python batch/run_scenarios.py batch/example_scenario.json --output resultados
+    python batch/run_scenarios.py noche/*.json --output /srv/corridas --workers 8
+    python batch/run_scenarios.py noche/*.json --check
+
+A scenario has a "name" (default: the file name) and one or both sections:
+
+    "ruta_optima": run_replications over a clinic
+        studies             {study: {"locales": n, "time": minutes}}, or the
+                            path of a JSON file with that content
+        admission_schedule  [[start minute, end minute, patients per minute], ...]
+        time_period, patients, min_studies, max_studies, engine
+        strategies          ["lookahead", "random"]
+        lookaheads          [1, 2, 3]; default 0-6 as in run_replications
+        seeds               number of seeds or a list of seeds
+        adaptive            instead of seeds, options for
+                            adaptive_workflow_replications (seed,
+                            rel_precision, abs_precision, max_replications...)
+
+    "fila_de_espera": simular_red over the sucursales
+        turnos              CSV/XLSX export(s) of turnos, or the Parquet folder
+                            written by carga_turnos.procesar_turnos
+        perfiles            optional .npz cache for AlmacenPerfiles
+        fecha, dias, semilla, estudios, lookahead, espera_maxima
+        cajas               {sucursal: cajas}; default CAJAS_POR_SUCURSAL
+        locales             {sucursal: studies} for sucursales whose patients
+                            also go through Ruta optima
+
+Relative paths are taken from the scenario file's folder. Only the standard
+library is loaded at start-up: numpy, pandas and the simulators are imported
+by the section that runs, and no plotting library is imported at all.
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO / "Ruta optima"))
+sys.path.insert(0, str(REPO / "Fila de espera"))
+
+
+SECTIONS = {
+    "ruta_optima": {
+        "studies", "admission_schedule", "time_period", "patients", "min_studies",
+        "max_studies", "strategies", "lookaheads", "seeds", "engine", "adaptive",
+    },
+    "fila_de_espera": {
+        "turnos", "perfiles", "fecha", "dias", "cajas", "semilla", "locales",
+        "estudios", "lookahead", "espera_maxima",
+    },
+}
+REQUIRED = {
+    "ruta_optima": {"studies", "admission_schedule"},
+    "fila_de_espera": {"turnos", "fecha"},
+}
+FORMATS = ("parquet", "json")
+
+
+# ---------------------------------------------------------------------------
+# Scenario files
+# ---------------------------------------------------------------------------
+
+def load_scenario(path):
+    """Reads and checks a scenario file; the result keeps its own folder under "base"."""
+    path = Path(path)
+    with open(path, encoding="utf-8") as f:
+        scenario = json.load(f)
+    if not isinstance(scenario, dict):
+        raise ValueError(f"{path}: a scenario must be a JSON object")
+
+    unknown = set(scenario) - set(SECTIONS) - {"name"}
+    if unknown:
+        raise ValueError(f"{path}: unknown keys {sorted(unknown)}")
+    if not any(section in scenario for section in SECTIONS):
+        raise ValueError(f"{path}: needs at least one of {sorted(SECTIONS)}")
+    for section, keys in SECTIONS.items():
+        if section not in scenario:
+            continue
+        spec = scenario[section]
+        unknown = set(spec) - keys
+        if unknown:
+            raise ValueError(f"{path}: unknown keys in {section}: {sorted(unknown)}")
+        missing = REQUIRED[section] - set(spec)
+        if missing:
+            raise ValueError(f"{path}: {section} needs {sorted(missing)}")
+    ruta = scenario.get("ruta_optima")
+    if ruta is not None and "seeds" in ruta and "adaptive" in ruta:
+        raise ValueError(f"{path}: ruta_optima takes either seeds or adaptive, not both")
+
+    scenario.setdefault("name", path.stem)
+    scenario["base"] = path.resolve().parent
+    return scenario
+
+
+def _path(base, value):
+    path = Path(value)
+    return path if path.is_absolute() else base / path
+
+
+def _studies(base, spec):
+    from SimFinal import Study
+
+    if isinstance(spec, str):
+        with open(_path(base, spec), encoding="utf-8") as f:
+            spec = json.load(f)
+    return {name: Study(name, s["locales"], s["time"]) for name, s in spec.items()}
+
+
+# ---------------------------------------------------------------------------
+# Sections
+# ---------------------------------------------------------------------------
+
+def run_ruta_optima(spec, base, max_workers=None):
+    """Returns {table name: DataFrame} for the ruta_optima section."""
+    import pandas as pd
+
+    study_defs = _studies(base, spec["studies"])
+    admission_schedule = {
+        (int(start), int(end)): float(rate) for start, end, rate in spec["admission_schedule"]
+    }
+    options = {
+        option: spec[key]
+        for key, option in [
+            ("lookaheads", "lookaheads"), ("patients", "n_patients"), ("min_studies", "min_studies"),
+            ("max_studies", "max_studies"), ("time_period", "time_period"),
+        ]
+        if key in spec
+    }
+    strategies = spec.get("strategies", ["lookahead", "random"])
+
+    if "adaptive" in spec:
+        from adaptive import adaptive_workflow_replications
+
+        if "lookahead" not in strategies:
+            options["lookaheads"] = []
+        runs, summary = adaptive_workflow_replications(
+            study_defs, admission_schedule, include_random="random" in strategies,
+            max_workers=max_workers, **options, **spec["adaptive"],
+        )
+        for table in (runs, summary):
+            table.insert(0, "strategy", [scenario[0] for scenario in table["scenario"]])
+            table.insert(1, "lookahead", pd.array([scenario[1] for scenario in table["scenario"]], dtype="Int64"))
+            table.drop(columns="scenario", inplace=True)
+        return {"routes": runs, "routes_summary": summary}
+
+    from replications import run_replications
+
+    seeds = spec.get("seeds", 100)
+    runs = run_replications(
+        study_defs, admission_schedule,
+        seeds=range(seeds) if isinstance(seeds, int) else seeds,
+        strategies=strategies, engine=spec.get("engine", "events"),
+        max_workers=max_workers, **options,
+    )
+    summary = (
+        runs.groupby(["strategy", "lookahead"], dropna=False, sort=False)
+        .agg(
+            replications=("seed", "size"),
+            mean_wait=("average_wait_time_completed", "mean"),
+            std_wait=("average_wait_time_completed", "std"),
+            mean_completed=("num_completed", "mean"),
+        )
+        .reset_index()
+    )
+    return {"routes": runs, "routes_summary": summary}
+
+
+def run_fila_de_espera(spec, base, max_workers=None):
+    """Returns {table name: DataFrame} for the fila_de_espera section."""
+    from carga_turnos import CAJAS_POR_SUCURSAL, cargar_turnos, leer_turnos
+    from red_sucursales import simular_red
+
+    turnos = spec["turnos"]
+    fuentes = [_path(base, ruta) for ruta in ([turnos] if isinstance(turnos, str) else turnos)]
+    if len(fuentes) == 1 and fuentes[0].is_dir():
+        df = cargar_turnos(fuentes[0])
+    else:
+        df = leer_turnos(fuentes)
+
+    perfiles = None
+    if "perfiles" in spec:
+        from perfiles import AlmacenPerfiles
+
+        perfiles = AlmacenPerfiles(df, _path(base, spec["perfiles"]))
+
+    locales = {
+        sucursal: _studies(base, studies) for sucursal, studies in spec.get("locales", {}).items()
+    }
+    opciones = {
+        clave: spec[clave] for clave in ("dias", "semilla", "lookahead", "espera_maxima") if clave in spec
+    }
+    if "estudios" in spec:
+        opciones["estudios"] = tuple(spec["estudios"])
+    red = simular_red(
+        spec.get("cajas", CAJAS_POR_SUCURSAL), df, spec["fecha"],
+        locales_por_sucursal=locales, perfiles=perfiles, max_workers=max_workers, **opciones,
+    )
+
+    tables = {
+        "reception": red["atencion"],
+        "reception_summary": red["resumen"].reset_index(),
+    }
+    if red["ruta"] is not None:
+        tables["reception_routes"] = red["ruta"]
+        tables["reception_routes_summary"] = red["resumen_ruta"].reset_index()
+    return tables
+
+
+RUNNERS = {
+    "ruta_optima": run_ruta_optima,
+    "fila_de_espera": run_fila_de_espera,
+}
+
+
+# ---------------------------------------------------------------------------
+# Output
+# ---------------------------------------------------------------------------
+
+def write_table(table, path, fmt):
+    """Writes a DataFrame as path.parquet or path.json; returns the file written."""
+    if fmt == "parquet":
+        target = path.with_suffix(".parquet")
+        table.to_parquet(target, index=False)
+    else:
+        target = path.with_suffix(".json")
+        table.to_json(target, orient="records", date_format="iso", force_ascii=False)
+    return target
+
+
+def _jsonable(value):
+    # numpy scalars and timestamps in summary records
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def run_scenario(scenario, output, fmt="parquet", max_workers=None):
+    """Runs every section of a loaded scenario and writes it under output/name."""
+    destination = Path(output) / scenario["name"]
+    destination.mkdir(parents=True, exist_ok=True)
+    summary = {
+        "name": scenario["name"],
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "scenario": {section: scenario[section] for section in SECTIONS if section in scenario},
+        "elapsed_seconds": {},
+        "tables": {},
+        "summaries": {},
+    }
+
+    for section, runner in RUNNERS.items():
+        if section not in scenario:
+            continue
+        start = time.perf_counter()
+        tables = runner(scenario[section], scenario["base"], max_workers)
+        summary["elapsed_seconds"][section] = time.perf_counter() - start
+        for name, table in tables.items():
+            target = write_table(table, destination / name, fmt)
+            summary["tables"][name] = {"file": target.name, "rows": len(table)}
+            if name.endswith("_summary"):
+                # None instead of NaN / <NA> in the JSON
+                records = table.astype(object).where(table.notna(), None)
+                summary["summaries"][name] = records.to_dict(orient="records")
+
+    with open(destination / "summary.json", "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False, default=_jsonable)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run simulation scenarios without notebooks")
+    parser.add_argument("scenarios", nargs="+", help="JSON scenario files")
+    parser.add_argument("--output", default="resultados", help="folder for the results (default: resultados)")
+    parser.add_argument("--format", choices=FORMATS, default="parquet",
+                        help="table format; parquet needs pyarrow (default: parquet)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU; 1 runs in this process)")
+    parser.add_argument("--check", action="store_true", help="only validate the scenario files")
+    args = parser.parse_args(argv)
+
+    # Validate every file before running anything, so a typo does not cost a night
+    try:
+        scenarios = [load_scenario(path) for path in args.scenarios]
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    names = [scenario["name"] for scenario in scenarios]
+    duplicated = sorted({name for name in names if names.count(name) > 1})
+    if duplicated:
+        parser.error(f"duplicated scenario names {duplicated}")
+    if args.check:
+        for scenario in scenarios:
+            print(f"{scenario['name']}: ok ({', '.join(s for s in SECTIONS if s in scenario)})")
+        return
+
+    if args.format == "parquet":
+        try:
+            import pyarrow  # noqa: F401  (fail before running anything)
+        except ImportError:
+            parser.error("--format parquet needs pyarrow; install it or use --format json")
+
+    for scenario in scenarios:
+        summary = run_scenario(scenario, args.output, args.format, args.workers)
+        elapsed = sum(summary["elapsed_seconds"].values())
+        print(f"{scenario['name']}: {len(summary['tables'])} tables in {elapsed:.1f} s "
+              f"-> {Path(args.output) / scenario['name']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,465 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for the Fila de espera and Ruta optima simulators.
+
+Times simulate_workflow, simulate_workflow_random (tick and event engines),
+simular_atencion, simular_atencion_heap and simulacion_pacientes on
+fixed-seed synthetic workloads, and checks that the fast paths reproduce the
+reference outputs on the same seed. Results are written as JSON:
+
+    python benchmarks/bench_simuladores.py --output bench.json
+    python benchmarks/bench_simuladores.py --quick
+    python benchmarks/bench_simuladores.py --full   # every lookahead 1-7, cajas 1-10
+
+The process exits with status 1 if any equivalence check fails.
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO / "Ruta optima"))
+sys.path.insert(0, str(REPO / "Fila de espera"))
+
+import numpy as np
+import pandas as pd
+
+from SimFinal import (
+    Study,
+    get_current_mean_admission_rate,
+    get_fastest_study,
+    simulate_workflow,
+    simulate_workflow_random,
+)
+from adaptive import t_quantile
+from admission_schedule import AdmissionSchedule
+from event_engine import simulate_workflow_events, simulate_workflow_random_events
+from patient_arrays import PatientArrays, simulate_workflow_arrays
+from replications import generate_patients
+from router import LookaheadRouter
+from despachador import reproducir_dia
+from prioridad_dinamica import simular_atencion, simular_atencion_heap
+from simulaciones import simulacion_pacientes, simulacion_pacientes_vectorizada
+
+
+SEED = 20250527
+TIME_PERIOD = 1440
+OPERATIONAL_MINUTES = 8 * 60
+FECHA_BASE = "2025-05-27"
+
+# Same clinic as FinalSimulation.ipynb
+STUDY_DEFS = {
+    "densitometria": Study("densitometria", 2, 7),
+    "electrocardiograma": Study("electrocardiograma", 2, 7),
+    "laboratorio": Study("laboratorio", 13, 3),
+    "mastografia": Study("mastografia", 3, 8),
+    "nutricion": Study("nutricion", 2, 13),
+    "optometria": Study("optometria", 6, 10),
+    "papanicolaou": Study("papanicolaou", 1, 8),
+    "rayosx": Study("rayosx", 2, 5),
+    "rem": Study("rem", 1, 32),
+    "tomografia": Study("tomografia", 1, 14),
+    "ultrasonido": Study("ultrasonido", 7, 16),
+}
+
+
+# ---------------------------------------------------------------------------
+# Synthetic workloads
+# ---------------------------------------------------------------------------
+
+def admission_schedule_for(n_patients):
+    """Constant rate over the operational hours, as in the notebook."""
+    return {
+        (0, OPERATIONAL_MINUTES): n_patients / OPERATIONAL_MINUTES,
+        (OPERATIONAL_MINUTES, TIME_PERIOD): 0.0,
+    }
+
+
+def cohort(n_patients, max_studies, seed):
+    rng = np.random.default_rng(seed)
+    return generate_patients(rng, n_patients, STUDY_DEFS, 1, max_studies)
+
+
+def historial_turnos(pacientes_por_dia, seed, dias=20):
+    """Synthetic turnos history for one sucursal with ~pacientes_por_dia arrivals a day."""
+    rng = np.random.default_rng(seed)
+    n = pacientes_por_dia * dias
+    minutos = np.clip(rng.normal(10 * 60, 150, n), 6 * 60, 18 * 60 - 1).astype(int)
+    llegada = (
+        pd.Timestamp("2025-01-01")
+        + pd.to_timedelta(rng.integers(0, dias, n), unit="D")
+        + pd.to_timedelta(minutos, unit="m")
+    )
+    return pd.DataFrame({
+        "Sucursal": "SINTETICA",
+        "FechaHoraLLegada": llegada,
+        "Prioridad": rng.choice([1, 0], size=n, p=[0.6, 0.4]),
+        "TAPRecepcionMinutos": rng.gamma(2.0, 1.5, n),
+    })
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def measure(setup, run, count_events, memory=True):
+    """Wall time of run(setup()), then peak traced memory on a second run."""
+    state = setup()
+    start = time.perf_counter()
+    result = run(state)
+    wall_time = time.perf_counter() - start
+    events = count_events(state, result)
+
+    peak_memory_mb = None
+    if memory:
+        state = setup()
+        tracemalloc.start()
+        run(state)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_memory_mb = peak / 2**20
+
+    return {
+        "wall_time_s": wall_time,
+        "peak_memory_mb": peak_memory_mb,
+        "events": events,
+        "events_per_s": events / wall_time if wall_time > 0 else None,
+    }
+
+
+def workflow_events(patients, result):
+    """Admissions plus finished study sessions."""
+    admitted = len(patients) - len(result["still_in_arrival_queue"])
+    return admitted + sum(len(p.completed_studies) for p in patients)
+
+
+def bench_workflow(n_patients, max_studies, lookahead, engine, memory):
+    simulate = simulate_workflow if engine == "tick" else simulate_workflow_events
+    router = LookaheadRouter()
+    schedule = admission_schedule_for(n_patients)
+
+    def setup():
+        np.random.seed(SEED)
+        return cohort(n_patients, max_studies, SEED)
+
+    def run(patients):
+        router.cache_clear()
+        return simulate(
+            router, patients, STUDY_DEFS, TIME_PERIOD, schedule,
+            show_steps=False, lookahead=lookahead,
+        )
+
+    return measure(setup, run, workflow_events, memory)
+
+
+def bench_workflow_random(n_patients, max_studies, engine, memory):
+    simulate = simulate_workflow_random if engine == "tick" else simulate_workflow_random_events
+    schedule = admission_schedule_for(n_patients)
+
+    def setup():
+        np.random.seed(SEED)
+        random.seed(SEED)
+        return cohort(n_patients, max_studies, SEED)
+
+    def run(patients):
+        return simulate(patients, STUDY_DEFS, TIME_PERIOD, schedule, show_steps=False)
+
+    return measure(setup, run, workflow_events, memory)
+
+
+def bench_simular_atencion(df_sim, cajas, version, memory):
+    if version == "heap":
+        simular = simular_atencion_heap
+    else:
+        def simular(df, n_cajas):
+            return simular_atencion(df, n_cajas, verbose=False)
+
+    return measure(
+        lambda: df_sim,
+        lambda df: simular(df, cajas),
+        lambda df, result: len(result),
+        memory,
+    )
+
+
+def bench_simulacion_pacientes(historial, version, memory):
+    if version == "vectorizada":
+        def generar(_):
+            return simulacion_pacientes_vectorizada(
+                "SINTETICA", historial, FECHA_BASE, rng=np.random.default_rng(SEED)
+            )
+    else:
+        def generar(_):
+            np.random.seed(SEED)
+            return simulacion_pacientes("SINTETICA", historial, FECHA_BASE)
+
+    return measure(lambda: None, generar, lambda _, result: len(result), memory)
+
+
+# ---------------------------------------------------------------------------
+# Equivalence checks
+# ---------------------------------------------------------------------------
+
+def _summary(result):
+    ids = lambda patients: [getattr(p, "id_num", p) for p in patients]
+    return (
+        ids(result["completed_patients"]),
+        [p.total_wait_time for p in result["completed_patients"]],
+        ids(result["waiting_patients_final_state_objects"]),
+        ids(result["active_sessions_final_state_patients"]),
+        ids(result["still_in_arrival_queue"]),
+        result["lines"],
+        result["average_wait_time_completed"],
+    )
+
+
+def _lookahead_reference(studies, lines, depth):
+    """The permutation search of get_fastest_study_lookahead (FinalSimulation.ipynb)."""
+    valid = [s for s in studies if s.locales > 0]
+    if not valid:
+        return None
+
+    def wait(study):
+        return (math.ceil((lines.get(study.name, 0) + 1) / study.locales) - 1) * study.time
+
+    if len(valid) == 1 or depth == 1:
+        times = {}
+        for study in valid:
+            times[wait(study)] = study
+        return times[min(times)]
+
+    length = max(min(depth, len(valid)), 1)
+    best_first, best_total_time = None, float("inf")
+    for first in valid:
+        others = [s for s in valid if s is not first]
+        rest = min(
+            (sum(wait(s) + s.time for s in seq) for seq in itertools.permutations(others, length - 1)),
+            default=0,
+        )
+        total_time = wait(first) + first.time + rest
+        if total_time < best_total_time:
+            best_first, best_total_time = first, total_time
+    return best_first
+
+
+def check_equivalence(n_patients=200):
+    checks = {}
+    schedule = admission_schedule_for(n_patients)
+    names = list(STUDY_DEFS)
+
+    for lookahead in (1, 3, 7):
+        outputs = []
+        for simulate in (simulate_workflow, simulate_workflow_events):
+            np.random.seed(SEED)
+            outputs.append(_summary(simulate(
+                LookaheadRouter(), cohort(n_patients, 7, SEED), STUDY_DEFS, TIME_PERIOD,
+                schedule, show_steps=False, lookahead=lookahead,
+            )))
+        checks[f"simulate_workflow_events_lookahead_{lookahead}"] = outputs[0] == outputs[1]
+
+    outputs = []
+    for simulate in (simulate_workflow_random, simulate_workflow_random_events):
+        np.random.seed(SEED)
+        random.seed(SEED)
+        outputs.append(_summary(simulate(
+            cohort(n_patients, 7, SEED), STUDY_DEFS, TIME_PERIOD, schedule, show_steps=False
+        )))
+    checks["simulate_workflow_random_events"] = outputs[0] == outputs[1]
+
+    # A compiled schedule shorter than the day: both engines go on at its default rate
+    short = AdmissionSchedule({(0, 240): n_patients / 480}, 300, default_rate=0.2)
+    outputs = []
+    for simulate in (simulate_workflow, simulate_workflow_events):
+        np.random.seed(SEED)
+        outputs.append(_summary(simulate(
+            LookaheadRouter(), cohort(n_patients, 7, SEED), STUDY_DEFS, TIME_PERIOD,
+            short, show_steps=False, lookahead=1,
+        )))
+    checks["short_admission_schedule"] = outputs[0] == outputs[1]
+
+    # The arrays engine lists studies in study_defs order, so compare on such a cohort
+    patients = cohort(n_patients, 7, SEED)
+    for p in patients:
+        p.studies_remaining.sort(key=lambda s: names.index(s.name))
+    arrays = PatientArrays.from_patients(patients, STUDY_DEFS)
+    np.random.seed(SEED)
+    expected = simulate_workflow_events(
+        LookaheadRouter(), patients, STUDY_DEFS, TIME_PERIOD, schedule,
+        show_steps=False, lookahead=3,
+    )
+    np.random.seed(SEED)
+    got = simulate_workflow_arrays(
+        LookaheadRouter(), arrays, STUDY_DEFS, TIME_PERIOD, schedule, lookahead=3
+    )
+    checks["simulate_workflow_arrays"] = (
+        [p.id_num for p in expected["completed_patients"]] == got["completed_patients"].tolist()
+        and expected["average_wait_time_completed"] == got["average_wait_time_completed"]
+    )
+
+    rng = np.random.default_rng(SEED)
+    router = LookaheadRouter()
+    same_route = True
+    for _ in range(500):
+        studies = [STUDY_DEFS[names[i]] for i in rng.choice(len(names), rng.integers(1, 7), replace=False)]
+        lines = {name: int(rng.integers(0, 40)) for name in names}
+        depth = int(rng.integers(0, 8))
+        same_route &= router(studies, lines, depth) is _lookahead_reference(studies, lines, depth)
+        same_route &= router(studies, lines, 1) is get_fastest_study(studies, lines)
+    checks["lookahead_router"] = bool(same_route)
+
+    example = {(0, 300): 0.0, (300, 360): 1.7, (360, 1080): 1.1, (1080, 1440): 0.0}
+    compiled = AdmissionSchedule(example, TIME_PERIOD)
+    checks["admission_schedule"] = all(
+        compiled.rate(t) == get_current_mean_admission_rate(t, example, 1.0)
+        for t in range(TIME_PERIOD)
+    )
+    # Two-sided 95% Student t critical values from the tables, dof 1-5
+    t_table = {1: 12.7062, 2: 4.3027, 3: 3.1824, 4: 2.7764, 5: 2.5706}
+    checks["t_quantile"] = all(
+        abs(t_quantile(0.95, dof) - value) < 5e-5 for dof, value in t_table.items()
+    )
+
+    historial = historial_turnos(n_patients, SEED)
+    df_sim = simulacion_pacientes_vectorizada(
+        "SINTETICA", historial, FECHA_BASE, rng=np.random.default_rng(SEED)
+    )
+    for cajas in (1, 4):
+        checks[f"simular_atencion_heap_cajas_{cajas}"] = simular_atencion(
+            df_sim, cajas, verbose=False
+        ).equals(simular_atencion_heap(df_sim, cajas))
+    # Unsorted rows: ties have to follow the DataFrame order, as max() does
+    desordenado = df_sim.sample(frac=1, random_state=SEED)
+    checks["reproducir_dia_desordenado"] = simular_atencion(
+        desordenado, 4, verbose=False
+    ).equals(reproducir_dia(desordenado, 4))
+    checks["despachador_sin_pandas"] = _despachador_sin_pandas()
+    # Prioridad with a pandas extension dtype, as the original simular_atencion took
+    esperado = simular_atencion_heap(df_sim, 4)
+    for tipo in ("category", "Int8"):
+        convertido = df_sim.astype({"Prioridad": tipo})
+        obtenido = simular_atencion_heap(convertido, 4)
+        checks[f"prioridad_{tipo.lower()}"] = (
+            simular_atencion(convertido, 4, verbose=False).equals(obtenido)
+            and obtenido.astype(esperado.dtypes).equals(esperado)
+        )
+
+    return checks
+
+
+# The live dispatcher takes plain datetimes and must not need numpy or pandas
+DESPACHADOR_SIN_PANDAS = """
+import sys
+sys.modules["numpy"] = sys.modules["pandas"] = None
+from datetime import datetime, timedelta
+from despachador import DespachadorCajas
+from prioridad_dinamica import Paciente
+hora = datetime(2025, 5, 27, 9)
+despachador = DespachadorCajas(cajas=2)
+despachador.encolar(Paciente(1, "S", hora, 1, 5))
+despachador.encolar(Paciente(2, "S", hora + timedelta(minutes=1), 0, 5))
+despachador.encolar(Paciente(3, "S", hora, 1, 5))
+atendidos = [despachador.caja_libre(1, hora + timedelta(minutes=2)).id, despachador.retirar(3),
+             despachador.caja_libre(2, hora + timedelta(minutes=2)).id, despachador.caja_libre(1, datetime.now())]
+assert atendidos == [1, True, 2, None], atendidos
+assert despachador.estado()["en_cola"] == 0 and not despachador.cola._estado
+"""
+
+
+def _despachador_sin_pandas():
+    proceso = subprocess.run(
+        [sys.executable, "-c", DESPACHADOR_SIN_PANDAS],
+        cwd=REPO / "Fila de espera", capture_output=True, text=True,
+    )
+    if proceso.returncode:
+        print(proceso.stderr, file=sys.stderr)
+    return proceso.returncode == 0
+
+
+# ---------------------------------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", help="JSON file for the results (default: stdout)")
+    parser.add_argument("--quick", action="store_true", help="200 and 950 patients, fewer grid points")
+    parser.add_argument("--full", action="store_true", help="every lookahead 1-7 and cajas 1-10")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument(
+        "--reference-max-patients", type=int, default=950,
+        help="largest workload for the minute-by-minute references (tick engines, simular_atencion)",
+    )
+    args = parser.parse_args(argv)
+
+    sizes = [200, 950] if args.quick else [200, 950, 5000]
+    max_studies_grid = [1, 4, 7]
+    lookaheads = list(range(1, 8)) if args.full else ([1, 7] if args.quick else [1, 4, 7])
+    cajas_grid = list(range(1, 11)) if args.full else ([1, 10] if args.quick else [1, 4, 10])
+    memory = not args.no_memory
+
+    cases = []
+
+    def record(function, variant, params, measured):
+        cases.append({"function": function, "variant": variant, **params, **measured})
+        print(f"{function:<28} {variant:<12} {params} {measured['wall_time_s']:.3f}s",
+              file=sys.stderr)
+
+    for n_patients in sizes:
+        engines = ["events"] + (["tick"] if n_patients <= args.reference_max_patients else [])
+        for max_studies, lookahead, engine in itertools.product(max_studies_grid, lookaheads, engines):
+            params = {"n_patients": n_patients, "max_studies": max_studies, "lookahead": lookahead}
+            record("simulate_workflow", engine, params,
+                   bench_workflow(n_patients, max_studies, lookahead, engine, memory))
+        for max_studies, engine in itertools.product(max_studies_grid, engines):
+            params = {"n_patients": n_patients, "max_studies": max_studies}
+            record("simulate_workflow_random", engine, params,
+                   bench_workflow_random(n_patients, max_studies, engine, memory))
+
+        historial = historial_turnos(n_patients, SEED)
+        for version in ("original", "vectorizada"):
+            record("simulacion_pacientes", version, {"n_patients": n_patients},
+                   bench_simulacion_pacientes(historial, version, memory))
+
+        df_sim = simulacion_pacientes_vectorizada(
+            "SINTETICA", historial, FECHA_BASE, rng=np.random.default_rng(SEED)
+        )
+        versions = ["heap"] + (["original"] if n_patients <= args.reference_max_patients else [])
+        for cajas, version in itertools.product(cajas_grid, versions):
+            params = {"n_patients": len(df_sim), "cajas": cajas}
+            record("simular_atencion", version, params,
+                   bench_simular_atencion(df_sim, cajas, version, memory))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        equivalence = check_equivalence()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "seed": SEED,
+        },
+        "cases": cases,
+        "equivalence": equivalence,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    else:
+        print(text)
+    return 0 if all(equivalence.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())